@@ -1,32 +1,24 @@
 import calendar
 import datetime
+import hashlib
 import json
 import logging
+import os
 
-import boto3
 from dateutil import parser
-from neo4j import GraphDatabase
 
+import util.config as config
+import util.db as db
 import util.queries as q
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-ssmc = boto3.client('ssm')
 
-
-def get_ssm_param(key):
-    resp = ssmc.get_parameter(
-        Name=key,
-        WithDecryption=True
-    )
-    return resp['Parameter']['Value']
-
-
-host_port = get_ssm_param('com.neo4j.graphacademy.dbhostport')
-user = get_ssm_param('com.neo4j.graphacademy.dbuser')
-password = get_ssm_param('com.neo4j.graphacademy.dbpassword')
-
-db_driver = GraphDatabase.driver(f"neo4j://{host_port}", auth=(user, password))
+# Months stay open for a couple of days after they end so late imports still make it into the leaderboard
+MONTH_CLOSE_GRACE_DAYS = 2
+CURRENT_MONTH_TTL_SECONDS = int(os.environ.get("NINJAS_CACHE_TTL_SECONDS", "300"))
+# The graph copy of a closed month only changes when a backfill clears it, so instances and clients recheck hourly
+CLOSED_MONTH_TTL_SECONDS = 3600
 
 
 def workdays(d, end, excluded=(6, 7)):
@@ -38,15 +30,12 @@ def workdays(d, end, excluded=(6, 7)):
     return days
 
 
-def all_ninjas(event, context):
-    print(event)
-    print("fyneh")
-    qs = event.get("multiValueQueryStringParameters")
-    if qs and qs.get("date"):
-        now = parser.parse(qs["date"][0]).replace(day=1)
-    else:
-        now = datetime.datetime.now().replace(day=1)
+def is_closed(month_start):
+    next_month = (month_start + datetime.timedelta(days=32)).replace(day=1)
+    return datetime.datetime.now() >= next_month + datetime.timedelta(days=MONTH_CLOSE_GRACE_DAYS)
 
+
+def ninjas_body(now):
     start = now - datetime.timedelta(days=(now.isoweekday() + 1) % 7)
     end = now.replace(day=calendar.monthrange(now.year, now.month)[1])
     end = end - datetime.timedelta(days=(end.isoweekday() + 1) % 7)
@@ -55,7 +44,7 @@ def all_ninjas(event, context):
     weeks = [{"start": day, "end": day + datetime.timedelta(days=6)} for day in
              workdays(start, end, [2, 3, 4, 5, 6, 7])]
 
-    with db_driver.session() as session:
+    with db.get_driver().session() as session:
         params = {"year": now.year, "month": now.month}
         print("params", params)
         result = session.run(q.ninjas_api_discourse_query, params)
@@ -67,12 +56,98 @@ def all_ninjas(event, context):
 
         so_rows = [row.data() for row in result]
 
-    return {"statusCode": 200, "body": json.dumps({
+    return json.dumps({
         "discourse": discourse_rows,
         "so": so_rows,
         "weeks": [{"start": week["start"].strftime("%Y-%m-%d"),
                    "end": week["end"].strftime("%Y-%m-%d")}
                   for week in weeks]
+    })
+
+
+def cached_ninjas_body(now, closed):
+    # The graph copy is shared by every Lambda instance, so only one of them pays for the leaderboard scan
+    params = {"month": now.strftime("%Y-%m"), "ttl": CURRENT_MONTH_TTL_SECONDS, "closed": closed}
+    with db.get_driver().session() as session:
+        row = session.run(q.cached_ninjas_api_query, params).single()
+        if row:
+            return row["body"]
+
+        body = ninjas_body(now)
+        session.run(q.store_ninjas_api_cache_query, {**params, "body": body})
+    return body
+
+
+def etag_matches(headers, etag):
+    if_none_match = next((value for key, value in (headers or {}).items() if key.lower() == "if-none-match"), None)
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def all_ninjas(event, context):
+    print(event)
+    qs = event.get("multiValueQueryStringParameters")
+    if qs and qs.get("date"):
+        now = parser.parse(qs["date"][0]).replace(day=1)
+    else:
+        now = datetime.datetime.now().replace(day=1)
+    now = now.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+    closed = is_closed(now)
+    ttl = CLOSED_MONTH_TTL_SECONDS if closed else CURRENT_MONTH_TTL_SECONDS
+    body = config.cached(("ninjas", now.strftime("%Y-%m"), closed), lambda: cached_ninjas_body(now, closed), ttl)
+
+    etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest() + '"'
+    headers = {
+        "Content-Type": "application/json",
+        'Access-Control-Allow-Origin': '*',
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={ttl}"
+    }
+
+    if etag_matches(event.get("headers"), etag):
+        return {"statusCode": 304, "body": "", "headers": headers}
+    return {"statusCode": 200, "body": body, "headers": headers}
+
+
+RECOMMENDATIONS_PAGE_SIZE = 50
+RECOMMENDATIONS_MAX_PAGE_SIZE = 200
+
+
+def bad_request(message):
+    return {"statusCode": 400, "body": json.dumps({"error": message}), "headers": {
+        "Content-Type": "application/json",
+        'Access-Control-Allow-Origin': '*'
+    }}
+
+
+def recommendation_effectiveness(event, context):
+    qs = event.get("queryStringParameters") or {}
+    try:
+        page = max(int(qs.get("page", 0)), 0)
+        page_size = min(max(int(qs.get("pageSize", RECOMMENDATIONS_PAGE_SIZE)), 1), RECOMMENDATIONS_MAX_PAGE_SIZE)
+    except ValueError:
+        return bad_request("page and pageSize must be integers")
+    # Weeks start on Sunday, e.g. ?week=2020-06-07
+    week = qs.get("week")
+    if week:
+        try:
+            datetime.datetime.strptime(week, "%Y-%m-%d")
+        except ValueError:
+            return bad_request("week must be a date like 2020-06-07")
+
+    params = {"week": week, "skip": page * page_size, "limit": page_size + 1}
+    query = q.recommendation_effectiveness_week_query if week else q.recommendation_effectiveness_query
+    with db.get_driver().session() as session:
+        rows = session.read_transaction(lambda tx: tx.run(query, params).data())
+
+    return {"statusCode": 200, "body": json.dumps({
+        "recommendations": rows[:page_size],
+        "page": page,
+        "pageSize": page_size,
+        "hasMore": len(rows) > page_size
     }), "headers": {
         "Content-Type": "application/json",
         'Access-Control-Allow-Origin': '*'
@@ -0,0 +1,225 @@
+# Imports historical Discourse topics and posts through the same queries as the import-posts-topics webhook.
+#
+#   NEO4J_URI=neo4j://localhost:7687 NEO4J_USER=neo4j NEO4J_PASSWORD=... \
+#       python backfill.py --base-url https://community.neo4j.com --checkpoint backfill.json
+#
+# Topics are listed oldest first, so the page number in the checkpoint stays valid while new topics are created.
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from neo4j import GraphDatabase
+
+import util.discourse as discourse
+import util.ingest as ingest
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+POST_IDS_PER_REQUEST = 20
+
+
+class Stats:
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, stage, items, seconds):
+        count, total = self.stages.get(stage, (0, 0.0))
+        self.stages[stage] = (count + items, total + seconds)
+
+    def report(self):
+        for stage, (count, seconds) in self.stages.items():
+            rate = count / seconds if seconds else 0
+            logger.info(f"{stage:>8}: {count:8d} items in {seconds:8.2f}s ({rate:.1f}/sec)")
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)
+    return {"page": 0, "failed": []}
+
+
+def save_checkpoint(path, checkpoint):
+    with open(path + ".tmp", "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(path + ".tmp", path)
+
+
+class DiscourseFetcher:
+    def __init__(self, base_url, api_key=None, api_user=None):
+        # DiscourseClient retries 429s after their Retry-After and 5xx responses with backoff
+        self.client = discourse.DiscourseClient(base_url=base_url.rstrip("/"), api_key=api_key, api_user=api_user,
+                                                timeout=(5, 30), max_retries=6)
+
+    def get(self, path, params=None):
+        return self.client.get_json(path, params)
+
+    def topic_ids(self, page):
+        response = self.get("/latest.json", {"order": "created", "ascending": "true", "page": page})
+        topic_list = response["topic_list"]
+        ids = [topic["id"] for topic in topic_list["topics"]]
+        return ids, len(ids) >= topic_list.get("per_page", 30)
+
+    def topic(self, topic_id):
+        topic = self.get(f"/t/{topic_id}.json")
+        posts = topic["post_stream"]["posts"]
+        loaded = {post["id"] for post in posts}
+        missing = [post_id for post_id in topic["post_stream"]["stream"] if post_id not in loaded]
+        for i in range(0, len(missing), POST_IDS_PER_REQUEST):
+            response = self.get(f"/t/{topic_id}/posts.json",
+                                {"post_ids[]": missing[i:i + POST_IDS_PER_REQUEST]})
+            posts += response["post_stream"]["posts"]
+        return topic, posts
+
+
+def topic_events(topic, posts):
+    if topic.get("archetype") != "regular":
+        return []
+
+    created_by = topic.get("details", {}).get("created_by", {})
+    events = [("topic", {"topic": {
+        "id": topic["id"],
+        "title": topic["title"],
+        "slug": topic["slug"],
+        "archetype": topic["archetype"],
+        "created_at": topic["created_at"],
+        "category_id": topic["category_id"],
+        "user_id": topic.get("user_id", created_by.get("id")),
+        "like_count": topic.get("like_count"),
+        "views": topic.get("views"),
+        "reply_count": topic.get("reply_count"),
+        "created_by": {"username": created_by.get("username"),
+                       "avatar_template": created_by.get("avatar_template")}
+    }})]
+
+    for post in posts:
+        events.append(("post", {"post": {
+            "id": post["id"],
+            "topic_id": topic["id"],
+            "topic_title": topic["title"],
+            "topic_slug": topic["slug"],
+            "topic_archetype": topic["archetype"],
+            "user_id": post["user_id"],
+            "username": post["username"],
+            "avatar_template": post.get("avatar_template"),
+            "cooked": post["cooked"],
+            "created_at": post["created_at"],
+            "post_number": post["post_number"]
+        }}))
+    return events
+
+
+def fetch_topics(pool, fetcher, topic_ids):
+    def fetch(topic_id):
+        try:
+            return topic_id, fetcher.topic(topic_id)
+        except Exception as e:
+            logger.info(f"Couldn't fetch topic {topic_id}: {e}")
+            return topic_id, None
+
+    fetched = list(pool.map(fetch, topic_ids))
+    return [result for _, result in fetched if result], [topic_id for topic_id, result in fetched if not result]
+
+
+def timed(stats, stage, fn, items):
+    start = time.perf_counter()
+    result = fn()
+    stats.record(stage, items(result), time.perf_counter() - start)
+    return result
+
+
+def backfill(fetcher, driver, checkpoint_path, workers=8, batch_size=1000, max_pages=None):
+    checkpoint = load_checkpoint(checkpoint_path)
+    stats = Stats()
+    batcher = ingest.ImportBatcher(driver, batch_size=batch_size, flush_interval_ms=10 ** 9)
+    logger.info(f"Resuming backfill from page {checkpoint['page']}")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while max_pages is None or checkpoint["page"] < max_pages:
+            pages = list(range(checkpoint["page"], checkpoint["page"] + workers))
+            listings = timed(stats, "list", lambda: list(pool.map(fetcher.topic_ids, pages)), len)
+            topic_ids = [topic_id for listing, _ in listings for topic_id in listing]
+
+            topics, unfetched = timed(stats, "fetch", lambda: fetch_topics(pool, fetcher, topic_ids),
+                                      lambda fetched: sum(1 + len(posts) for _, posts in fetched[0]))
+
+            events = [event for topic, posts in topics for event in topic_events(topic, posts)]
+
+            def write():
+                results = []
+                for event_type, payload in events:
+                    results += batcher.add(event_type, payload, key=ingest.topic_id(event_type, payload))
+                return results + batcher.flush()
+
+            results = timed(stats, "write", write, len)
+            # Topics that couldn't be fetched or written are kept for --retry-failed instead of stopping the run
+            failed = {r["key"] for r in results if not r["ok"]} | set(unfetched)
+            checkpoint["failed"] = sorted(set(checkpoint["failed"]) | failed)
+
+            # A short listing means we've caught up, only full pages are safe to skip on the next run
+            full_pages = 0
+            for _, full in listings:
+                if not full:
+                    break
+                full_pages += 1
+            checkpoint["page"] += full_pages
+            save_checkpoint(checkpoint_path, checkpoint)
+            logger.info(f"Imported {len(topics)} topics, {len(events)} events, {len(failed)} topics failed. "
+                        f"Next page: {checkpoint['page']}")
+
+            if full_pages < len(pages):
+                break
+
+    stats.report()
+    return checkpoint
+
+
+def retry_failed(fetcher, driver, checkpoint_path, workers=8, batch_size=1000):
+    checkpoint = load_checkpoint(checkpoint_path)
+    batcher = ingest.ImportBatcher(driver, batch_size=batch_size, flush_interval_ms=10 ** 9)
+    logger.info(f"Retrying {len(checkpoint['failed'])} failed topics")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        topics, unfetched = fetch_topics(pool, fetcher, checkpoint["failed"])
+    results = []
+    for topic, posts in topics:
+        for event_type, payload in topic_events(topic, posts):
+            results += batcher.add(event_type, payload, key=ingest.topic_id(event_type, payload))
+    results += batcher.flush()
+
+    checkpoint["failed"] = sorted({r["key"] for r in results if not r["ok"]} | set(unfetched))
+    save_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="https://community.neo4j.com")
+    parser.add_argument("--checkpoint", default="backfill-checkpoint.json")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--retry-failed", action="store_true", help="Only re-import the topics that failed before")
+    args = parser.parse_args()
+    logging.basicConfig()
+
+    fetcher = DiscourseFetcher(args.base_url, os.environ.get("DISCOURSE_API_KEY"),
+                               os.environ.get("DISCOURSE_API_USERNAME"))
+    driver = GraphDatabase.driver(os.environ.get("NEO4J_URI", "neo4j://localhost:7687"),
+                                  auth=(os.environ.get("NEO4J_USER", "neo4j"), os.environ["NEO4J_PASSWORD"]))
+    if args.retry_failed:
+        checkpoint = retry_failed(fetcher, driver, args.checkpoint, workers=args.workers, batch_size=args.batch_size)
+    else:
+        checkpoint = backfill(fetcher, driver, args.checkpoint,
+                              workers=args.workers, batch_size=args.batch_size, max_pages=args.max_pages)
+    if checkpoint["failed"]:
+        logger.info(f"Topics with failed events: {checkpoint['failed']}")
+    driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Reports the import cost of each Lambda entry point in a fresh interpreter, which is what a cold start pays
+# before the handler runs. Secrets and the Neo4j driver are created on first use, so no AWS access is needed.
+#
+#   python -m benchmarks.cold_start --runs 5
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = sorted(set(re.findall(r"handler: ([\w/]+)\.\w+", open("serverless.yml").read())))
+
+HEAVY_MODULES = ["boto3", "bs4", "feedparser", "flask", "neo4j", "requests", "requests_toolbelt"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def measure(module, runs):
+    timings, loaded = [], ""
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True)
+        if output.returncode != 0:
+            return None, output.stderr.strip().splitlines()[-1]
+        elapsed, loaded = output.stdout.split(" ", 1)
+        timings.append(float(elapsed) * 1000)
+    return statistics.median(timings), loaded.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for entry_point in ENTRY_POINTS:
+        module = entry_point.replace("/", ".")
+        elapsed, loaded = measure(module, args.runs)
+        if elapsed is None:
+            print(f"{module:35} failed: {loaded}")
+        else:
+            print(f"{module:35} {elapsed:8.1f}ms  loads: {loaded or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Compares events/sec for per-event and batched post/topic imports against a scratch database.
+#
+#   NEO4J_URI=neo4j://localhost:7687 NEO4J_USER=neo4j NEO4J_PASSWORD=... \
+#       python -m benchmarks.import_posts_topics --events 5000 --batch-size 100
+#
+# Every run writes ids from --id-offset upwards, so point it at a database you don't mind filling up.
+import argparse
+import os
+import random
+import time
+
+from neo4j import GraphDatabase
+
+import util.ingest as ingest
+
+CATEGORY_ID = -1
+
+
+def synthetic_events(count, topics, id_offset):
+    events = []
+    for i in range(count):
+        topic_id = id_offset + random.randint(0, topics - 1)
+        user_id = id_offset + random.randint(0, 500)
+        if i < topics:
+            events.append(("topic", {"topic": {
+                "id": id_offset + i, "title": f"Topic {i}", "slug": f"topic-{i}", "archetype": "regular",
+                "created_at": "2020-06-01T10:00:00.000Z", "category_id": CATEGORY_ID, "user_id": user_id,
+                "like_count": 0, "views": 0, "reply_count": 0,
+                "created_by": {"username": f"user{user_id}", "avatar_template": ""}
+            }}))
+        else:
+            events.append(("post", {"post": {
+                "id": id_offset + i, "topic_id": topic_id, "topic_title": f"Topic {topic_id}",
+                "topic_slug": f"topic-{topic_id}", "topic_archetype": "regular", "user_id": user_id,
+                "username": f"user{user_id}", "avatar_template": "", "cooked": "<p>Hello</p>",
+                "created_at": "2020-06-01T10:00:00.000Z", "post_number": i
+            }}))
+    return events
+
+
+def per_event(driver, events):
+    for event_type, payload in events:
+        with driver.session() as session:
+            session.run(ingest.SINGLE_QUERIES[event_type], {"params": payload}).consume()
+
+
+def batched(driver, events, batch_size):
+    batcher = ingest.ImportBatcher(driver, batch_size=batch_size, flush_interval_ms=10 ** 9)
+    results = []
+    for i, (event_type, payload) in enumerate(events):
+        results += batcher.add(event_type, payload, key=i)
+    results += batcher.flush()
+    return len([r for r in results if not r["ok"]])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--id-offset", type=int, default=10 ** 9)
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(os.environ.get("NEO4J_URI", "neo4j://localhost:7687"),
+                                  auth=(os.environ.get("NEO4J_USER", "neo4j"), os.environ["NEO4J_PASSWORD"]))
+    with driver.session() as session:
+        session.run("MERGE (:DiscourseCategory {id: $id})", {"id": CATEGORY_ID}).consume()
+
+    events = synthetic_events(args.events, args.topics, args.id_offset)
+
+    start = time.perf_counter()
+    per_event(driver, events)
+    per_event_seconds = time.perf_counter() - start
+
+    events = synthetic_events(args.events, args.topics, args.id_offset + args.events)
+    start = time.perf_counter()
+    failures = batched(driver, events, args.batch_size)
+    batched_seconds = time.perf_counter() - start
+
+    print(f"per-event: {args.events / per_event_seconds:10.1f} events/sec ({per_event_seconds:.2f}s)")
+    print(f"batched:   {args.events / batched_seconds:10.1f} events/sec ({batched_seconds:.2f}s, "
+          f"batch size {args.batch_size}, {failures} failed)")
+    driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# PROFILEs the Stack Overflow part of the AllNinjas API before and after the Answer.effectiveDate migration.
+#
+#   NEO4J_URI=neo4j://localhost:7687 NEO4J_USER=neo4j NEO4J_PASSWORD=... \
+#       python -m benchmarks.so_month_filter --answers 1000000 --month 2019-06
+#
+# Loads synthetic :Answer nodes spread over three years, so point it at a scratch database.
+import argparse
+import os
+import time
+
+from neo4j import GraphDatabase
+
+import util.queries as q
+import util.schema as schema
+
+LEGACY_SO_QUERY = """\
+WITH $now as currentMonth
+Match (u:User:StackOverflow)
+match (u)-[:POSTED]->(a:Answer)-[:ANSWERED]->(q:Question)
+WHERE apoc.date.format(coalesce(a.created,q.created),'s','yyyy-MM') = currentMonth
+with *, apoc.date.format(coalesce(a.created,q.created),'s','yyyy-MM-W') as week
+with currentMonth, week, u.name as user, count(*) as total, sum(case when a.is_accepted then 1 else 0 end) as accepted
+ORDER BY total DESC
+return currentMonth, user, collect([week,total,accepted]) as weekly
+"""
+
+CREATE_USERS = """\
+UNWIND range(0, $users - 1) AS i
+CREATE (:User:StackOverflow {name: 'so-user-' + i, benchmarkId: i})
+"""
+
+# One in ten answers has no created date of its own and falls back to its question's
+CREATE_ANSWERS = """\
+UNWIND range($from, $to - 1) AS i
+MATCH (u:User:StackOverflow {benchmarkId: i % $users})
+WITH u, i, datetime('2018-01-01T00:00:00Z').epochSeconds + toInteger(rand() * 3 * 365 * 86400) AS created
+CREATE (u)-[:POSTED]->(a:Answer {is_accepted: rand() < 0.3})-[:ANSWERED]->(:Question {created: created - 3600})
+FOREACH (_ IN CASE WHEN i % 10 = 0 THEN [] ELSE [1] END | SET a.created = created)
+"""
+
+
+def db_hits(plan):
+    if isinstance(plan, dict):
+        return plan.get("dbHits", 0) + sum(db_hits(child) for child in plan.get("children", []))
+    return plan.db_hits + sum(db_hits(child) for child in plan.children)
+
+
+def profile(session, query, params):
+    start = time.perf_counter()
+    result = session.run("PROFILE " + query, params)
+    rows = sorted((row["user"], sorted(row["weekly"])) for row in result)
+    seconds = time.perf_counter() - start
+    return rows, db_hits(result.consume().profile), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--month", default="2019-06")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(os.environ.get("NEO4J_URI", "neo4j://localhost:7687"),
+                                  auth=(os.environ.get("NEO4J_USER", "neo4j"), os.environ["NEO4J_PASSWORD"]))
+    with driver.session() as session:
+        session.run("CREATE INDEX ON :StackOverflow(benchmarkId)").consume()
+        session.run("CALL db.awaitIndexes()").consume()
+        session.run(CREATE_USERS, {"users": args.users}).consume()
+        for start in range(0, args.answers, args.batch_size):
+            end = min(start + args.batch_size, args.answers)
+            session.run(CREATE_ANSWERS, {"from": start, "to": end, "users": args.users}).consume()
+
+        params = {"now": args.month}
+        before, before_hits, before_seconds = profile(session, LEGACY_SO_QUERY, params)
+
+        schema.migrate(driver)
+        start = time.perf_counter()
+        session.run(q.set_answer_effective_dates_query).consume()
+        migration_seconds = time.perf_counter() - start
+
+        after, after_hits, after_seconds = profile(session, q.ninjas_api_so_query, params)
+
+    print(f"before:    {before_hits:12d} db hits in {before_seconds:.2f}s")
+    print(f"after:     {after_hits:12d} db hits in {after_seconds:.2f}s")
+    print(f"migration: {migration_seconds:.2f}s, results {'match' if before == after else 'DIFFER'}")
+    driver.close()
+
+
+if __name__ == "__main__":
+    main()
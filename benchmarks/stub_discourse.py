@@ -0,0 +1,88 @@
+# A local stand-in for the Discourse listing endpoints used by backfill.py, serving synthetic topics and posts.
+#
+#   python -m benchmarks.stub_discourse --topics 3000 --posts-per-topic 12 --port 4100
+#   python backfill.py --base-url http://localhost:4100
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PER_PAGE = 30
+POSTS_IN_TOPIC_RESPONSE = 20
+
+
+class StubDiscourse:
+    def __init__(self, topics, posts_per_topic, category_id):
+        self.topics = topics
+        self.posts_per_topic = posts_per_topic
+        self.category_id = category_id
+
+    def post(self, topic_id, number):
+        user_id = (topic_id * 7 + number) % 500 + 1
+        return {"id": topic_id * 1000 + number, "topic_id": topic_id, "post_number": number,
+                "user_id": user_id, "username": f"user{user_id}", "avatar_template": "",
+                "cooked": f"<p>Post {number} of topic {topic_id}</p>",
+                "created_at": "2020-06-01T10:00:00.000Z"}
+
+    def latest(self, page):
+        ids = range(page * PER_PAGE + 1, min((page + 1) * PER_PAGE, self.topics) + 1)
+        return {"topic_list": {"per_page": PER_PAGE, "topics": [{"id": topic_id} for topic_id in ids]}}
+
+    def topic(self, topic_id):
+        posts = [self.post(topic_id, number) for number in range(1, self.posts_per_topic + 1)]
+        return {"id": topic_id, "title": f"Topic {topic_id}", "slug": f"topic-{topic_id}", "archetype": "regular",
+                "created_at": "2020-06-01T10:00:00.000Z", "category_id": self.category_id,
+                "user_id": posts[0]["user_id"], "like_count": 0, "views": topic_id, "reply_count": len(posts) - 1,
+                "details": {"created_by": {"id": posts[0]["user_id"], "username": posts[0]["username"],
+                                           "avatar_template": ""}},
+                "post_stream": {"posts": posts[:POSTS_IN_TOPIC_RESPONSE], "stream": [post["id"] for post in posts]}}
+
+    def posts(self, topic_id, post_ids):
+        return {"post_stream": {"posts": [self.post(topic_id, int(post_id) % 1000) for post_id in post_ids]}}
+
+
+def handler_for(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            parts = url.path.strip("/").split("/")
+
+            if url.path == "/latest.json":
+                body = stub.latest(int(query.get("page", ["0"])[0]))
+            elif parts[0] == "t" and len(parts) == 2:
+                body = stub.topic(int(parts[1].replace(".json", "")))
+            elif parts[0] == "t" and len(parts) == 3 and parts[2] == "posts.json":
+                body = stub.posts(int(parts[1]), query.get("post_ids[]", []))
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--posts-per-topic", type=int, default=5)
+    parser.add_argument("--category-id", type=int, default=-1)
+    parser.add_argument("--port", type=int, default=4100)
+    args = parser.parse_args()
+
+    stub = StubDiscourse(args.topics, args.posts_per_topic, args.category_id)
+    ThreadingHTTPServer(("localhost", args.port), handler_for(stub)).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
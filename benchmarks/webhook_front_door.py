@@ -0,0 +1,64 @@
+# Load-tests the webhook front door offline: acknowledges synthetic Discourse events onto a memory or file queue,
+# then drains them with stand-in processors that sleep for --process-ms instead of calling Neo4j or Discourse.
+#
+#   python -m benchmarks.webhook_front_door --events 10000 --queue file:///tmp/webhooks
+import argparse
+import json
+import statistics
+import time
+
+import util.webhooks as webhooks
+import util.work_queue as work_queue
+
+ROUTES = ["community_content", "user_events", "update_profile", "import_posts_topics"]
+
+
+def synthetic_request(i):
+    return {
+        "headers": {"X-Discourse-Event-Type": "post", "X-Discourse-Event": "post_created"},
+        "body": json.dumps({"post": {"id": i, "topic_id": i % 100, "post_number": 2, "cooked": "<p>Hello</p>"}})
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--queue", default="memory://benchmark")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--process-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    queue = work_queue.queue_from_url(args.queue)
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.events):
+        request_start = time.perf_counter()
+        response = webhooks.acknowledge(synthetic_request(i), ROUTES[i % len(ROUTES)], queue)
+        latencies.append((time.perf_counter() - request_start) * 1000)
+        assert response["statusCode"] == 200, response
+    ack_seconds = time.perf_counter() - start
+
+    def process(request):
+        time.sleep(args.process_ms / 1000)
+
+    def process_batch(messages):
+        time.sleep(args.process_ms / 1000)
+        return []
+
+    start = time.perf_counter()
+    processed, failed = webhooks.drain(
+        queue,
+        lambda messages: webhooks.dispatch(messages, {route: process for route in ROUTES[:-1]},
+                                           {"import_posts_topics": process_batch}),
+        batch_size=args.batch_size)
+    drain_seconds = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"ack:   {args.events / ack_seconds:10.1f} events/sec, "
+          f"p50 {statistics.median(latencies):.3f}ms, p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f}ms")
+    print(f"drain: {processed / drain_seconds:10.1f} events/sec ({processed} processed, {failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import util.aws as aws
+import util.db as db
+import util.discourse as discourse
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+BADGE_REFRESH_CHUNK_SIZE = 25
+BADGE_FETCH_WORKERS = 8
+BADGE_GRANT_WORKERS = 8
+# Small enough that one message is granted well within the function's timeout at scheduled priority
+ASSIGN_BADGE_CHUNK_SIZE = 20
+
+
+def grant_badge(user, badge_id):
+    try:
+        r = discourse.get_client().grant_badge(user["userName"], badge_id)
+    except Exception as e:
+        logger.info(f"Couldn't grant badge {badge_id} to {user['userName']}: {e}")
+        return user, False
+    logger.info(f"user: {user['userName']}, discourseId: {user['discourseId']}, response: {r}")
+    return user, r.ok
+
+
+def assign_badges(event, context):
+    grants = {}
+    for record in event["Records"]:
+        message = json.loads(record["Sns"]["Message"])
+        # Messages published before users were batched carry a single user
+        for user in message.get("users") or [message]:
+            grants.setdefault(message["badgeId"], []).append(user)
+
+    for badge_id, users in grants.items():
+        with db.get_driver().session() as session:
+            certified = {row["externalId"] for row in
+                         session.run(q.certified_users_query, {"externalIds": [user["externalId"] for user in users]})}
+            holders = {row["discourseId"] for row in
+                       session.run(q.badge_holders_query, {"badgeId": badge_id,
+                                                           "discourseIds": [user["discourseId"] for user in users]})}
+        users = [user for user in users if user["externalId"] in certified and user["discourseId"] not in holders]
+        logger.info(f"Granting badge {badge_id} to {len(users)} certified users")
+
+        with ThreadPoolExecutor(max_workers=BADGE_GRANT_WORKERS) as pool:
+            granted = [user for user, ok in pool.map(lambda user: grant_badge(user, badge_id), users) if ok]
+
+        with db.get_driver().session() as session:
+            params = {"badgeId": badge_id, "discourseIds": [user["discourseId"] for user in granted]}
+            session.write_transaction(lambda tx: tx.run(q.confirm_badges_query, params).consume())
+        logger.info(f"Granted badge {badge_id} to {len(granted)} of {len(users)} users")
+
+    discourse.get_client().log_stats()
+
+
+def find_users_badges(event, context):
+    topic_arn = aws.construct_topic_arn(context, aws.STORE_BADGES_TOPIC)
+
+    with db.get_driver().session() as session:
+        users = [{"discourseId": row["discourseId"], "userName": row["userName"]}
+                 for row in session.run(q.users_badge_refresh_query)]
+    logger.info(f"Refreshing badges for {len(users)} users")
+
+    sns = aws.client('sns')
+    for i in range(0, len(users), BADGE_REFRESH_CHUNK_SIZE):
+        sns.publish(TopicArn=topic_arn, Message=json.dumps({"users": users[i:i + BADGE_REFRESH_CHUNK_SIZE]}))
+
+
+def fetch_user_badges(user):
+    try:
+        badges = discourse.get_client("background").user_badges(user["userName"])
+    except Exception as e:
+        # Left without a lastBadgeRefresh so the next refresh picks the user up again
+        logger.info(f"Couldn't fetch badges for {user['userName']}: {e}")
+        return None
+    return {"id": user["discourseId"], "badges": badges}
+
+
+def store_badges_tx(tx, params):
+    return tx.run(q.store_badges_query, params)
+
+
+def store_badges(event, context):
+    users = []
+    for record in event["Records"]:
+        message = json.loads(record["Sns"]["Message"])
+        # Messages published before users were chunked carry a single user
+        users += message.get("users") or [message]
+
+    with ThreadPoolExecutor(max_workers=BADGE_FETCH_WORKERS) as pool:
+        fetched = [user for user in pool.map(fetch_user_badges, users) if user]
+    logger.info(f"Fetched badges for {len(fetched)} of {len(users)} users")
+    discourse.get_client("background").log_stats()
+
+    if fetched:
+        with db.get_driver().session() as session:
+            result = session.write_transaction(store_badges_tx, {"users": fetched})
+            logger.info(f"result: {result.summary().counters}")
+
+
+def missing_badges(event, context):
+    with db.get_driver().session() as session:
+        users = [{"externalId": row["externalId"], "userName": row["userName"], "discourseId": row["discourseId"]}
+                 for row in session.run(q.users_who_passed_query_but_dont_have_badge)]
+    logger.info(f"{len(users)} certified users are missing the certification badge")
+
+    sns = aws.client('sns')
+    topic_arn = aws.construct_topic_arn(context, aws.ASSIGN_BADGES_TOPIC)
+    for i in range(0, len(users), ASSIGN_BADGE_CHUNK_SIZE):
+        message = {"users": users[i:i + ASSIGN_BADGE_CHUNK_SIZE], "badgeId": discourse.CERTIFICATION_BADGE_ID}
+        sns.publish(TopicArn=topic_arn, Message=json.dumps(message))
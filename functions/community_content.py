@@ -0,0 +1,67 @@
+import json
+import logging
+
+from retrying import retry
+
+import util.aws as aws
+import util.db as db
+import util.discourse as discourse
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+kudos_message = """
+Thanks for submitting!
+
+I've added a tag that allows your blog to be displayed on the community home page!
+"""
+
+
+@retry(stop_max_attempt_number=5, wait_random_max=1000)
+def set_community_content(params):
+    with db.get_driver().session() as session:
+        result = session.write_transaction(lambda tx: tx.run(q.community_content_query, params).single())
+        return result["alreadyApproved"]
+
+
+def community_content(request, context):
+    headers = request["headers"]
+
+    event_type = headers["X-Discourse-Event-Type"]
+    event = headers["X-Discourse-Event"]
+    print(f"Received {event_type}: {event}")
+
+    body = request["body"]
+    json_payload = json.loads(body)
+    print(json_payload)
+
+    tags = json_payload["topic"]["tags"]
+    kudos_tags = [tag for tag in tags if tag.startswith("kudos")]
+
+    if len(kudos_tags) > 0:
+        json_payload["approved"] = True
+        json_payload["rating"] = int(kudos_tags[0].split("-")[-1])
+
+    content_already_approved = set_community_content({"params": json_payload})
+
+    if len(kudos_tags) > 0 and not content_already_approved:
+        # The reply is created by send_posts so Discourse doesn't wait on a second API call
+        sns = aws.client('sns')
+        sns.publish(TopicArn=(aws.construct_topic_arn(context, aws.POSTS_TOPIC)),
+                    Message=json.dumps({
+                        "topic_id": str(json_payload["topic"]["id"]),
+                        "raw": kudos_message
+                    }))
+
+    return {"statusCode": 200, "body": "Got the event", "headers": {}}
+
+
+def send_posts(event, context):
+    for record in event["Records"]:
+        payload = json.loads(record["Sns"]["Message"])
+        # Posts for scheduled jobs say so, so they don't use up the budget reserved for webhook replies
+        priority = payload.pop("priority", "webhook")
+        response = discourse.get_client(priority).create_post(payload)
+        logger.info(f"payload: {payload}, response: {response} -> {response.json()}")
@@ -0,0 +1,134 @@
+import datetime
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import util.db as db
+import util.discourse as discourse
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+EDU_GROUP_ID = 49
+EDU_GROUP_NAME = "Neo4j-Educators"
+EDU_ADD_CHUNK_SIZE = 50
+EDU_INVITE_WORKERS = 8
+# Invites have to finish this long before the Lambda's timeout, leaving time to record them
+EDU_INVITE_CUTOFF_MS = 5000
+EDU_INVITE_GROUP_NAMES = "Neo4j-Educators"
+EDU_INVITE_MESSAGE = "The Neo4j Educator Program includes access to a private channel on our Community Site where you can ask questions, share resources, and learn from others. Join us!"
+# Even when the educator list hasn't changed, compare against Discourse now and then to pick up removed members
+EDU_FULL_SYNC_INTERVAL = datetime.timedelta(days=7)
+
+
+def edu_discourse_users_query(tx):
+    query = """
+    MATCH (edu:EduApplication)-[r:SUBMITTED_APPLICATION]-(user:User)-[r2:DISCOURSE_ACCOUNT]-(discourse:DiscourseUser)
+    WHERE edu.status = 'APPROVED'
+    RETURN DISTINCT(discourse.name) as discourse_users
+    """
+    return tx.run(query)
+
+
+def edu_group_sync_state_query(tx):
+    query = """
+    MATCH (group:DiscourseGroup {id: $groupId})
+    RETURN group.eduSyncHash AS hash, group.eduSyncedAt AS syncedAt
+    """
+    return tx.run(query, groupId=EDU_GROUP_ID).single()
+
+
+def edu_group_synced_update(tx, members_hash):
+    query = """
+    MERGE (group:DiscourseGroup {id: $groupId})
+    SET group.eduSyncHash = $hash, group.eduSyncedAt = datetime()
+    """
+    return tx.run(query, groupId=EDU_GROUP_ID, hash=members_hash)
+
+
+def assign_edu_group(request, context):
+    with db.get_driver().session() as session:
+        result = session.read_transaction(edu_discourse_users_query)
+        usernames = sorted({record['discourse_users'] for record in result if record['discourse_users']})
+        state = session.read_transaction(edu_group_sync_state_query)
+
+    members_hash = hashlib.sha256("\n".join(usernames).encode("utf-8")).hexdigest()
+    if state and state["hash"] == members_hash and state["syncedAt"] and \
+            state["syncedAt"].to_native() > datetime.datetime.now(datetime.timezone.utc) - EDU_FULL_SYNC_INTERVAL:
+        logger.info(f"{len(usernames)} approved educators, unchanged since {state['syncedAt']}")
+        return
+
+    client = discourse.get_client()
+    members = {member["username"].lower() for member in client.all_group_members(EDU_GROUP_NAME)}
+    missing = [username for username in usernames if username.lower() not in members]
+    logger.info(f"{len(usernames)} approved educators, {len(members)} group members, adding {missing}")
+
+    added = {username.lower() for username in
+             client.add_group_members_batched(EDU_GROUP_ID, missing, chunk_size=EDU_ADD_CHUNK_SIZE)}
+    failed = [username for username in missing if username.lower() not in added]
+    logger.info(f"Added {len(missing) - len(failed)} of {len(missing)} users to Edu group, failed: {failed}")
+
+    # Failed adds leave the old hash in place so tomorrow's run tries them again
+    if not failed:
+        with db.get_driver().session() as session:
+            session.write_transaction(edu_group_synced_update, members_hash)
+    client.log_stats()
+
+
+def edu_discourse_invite_query(tx):
+    query = """
+    MATCH (edu:EduApplication)<-[r:SUBMITTED_APPLICATION]-(user:User)
+    WHERE edu.status = 'APPROVED'
+    AND NOT exists(user.discourseInviteSent)
+    AND NOT exists((user)-[:DISCOURSE_ACCOUNT]->(:DiscourseUser))
+    RETURN DISTINCT(user.email) as edu_email
+    """
+    return tx.run(query)
+
+
+def edu_discourse_invited_update(tx, usersInvited):
+    query = """
+    UNWIND {usersInvited} as invitedUser
+    MATCH (user:User {email: invitedUser})-[:SUBMITTED_APPLICATION]->(edu:EduApplication)
+    WHERE edu.status = 'APPROVED'
+    AND NOT exists(user.discourseInviteSent)
+    AND NOT exists((user)-[:DISCOURSE_ACCOUNT]->(:DiscourseUser))
+    WITH distinct(user)
+     SET user.discourseInviteSent = datetime()
+    RETURN count(user) as userCount
+    """
+    return tx.run(query, usersInvited=usersInvited)
+
+
+def send_edu_invite(email, deadline):
+    try:
+        r = discourse.get_client().invite(email, EDU_INVITE_GROUP_NAMES, EDU_INVITE_MESSAGE, deadline=deadline)
+    except Exception as e:
+        logger.info(f"Couldn't invite {email}: {e}")
+        return email, False
+    if not r.ok:
+        logger.info(f"Couldn't invite {email}: {r.status_code} {r.text[:200]}")
+    return email, r.ok
+
+
+def send_edu_discourse_invites(request, context):
+    with db.get_driver().session() as session:
+        emails = [record['edu_email'] for record in session.read_transaction(edu_discourse_invite_query)]
+
+    deadline = time.monotonic() + (context.get_remaining_time_in_millis() - EDU_INVITE_CUTOFF_MS) / 1000 \
+        if context else None
+    with ThreadPoolExecutor(max_workers=EDU_INVITE_WORKERS) as pool:
+        outcomes = list(pool.map(lambda email: send_edu_invite(email, deadline), emails))
+
+    invited = [email for email, ok in outcomes if ok]
+    logger.info(f"Invited {len(invited)} of {len(emails)} Edu users to Discourse, "
+                f"failed: {[email for email, ok in outcomes if not ok]}")
+
+    # Every invite finishes before the deadline, which leaves EDU_INVITE_CUTOFF_MS to record them
+    if invited:
+        with db.get_driver().session() as session:
+            updated = session.write_transaction(edu_discourse_invited_update, invited)
+            for record in updated:
+                logger.info(f"Updated {record['userCount']} users invited")
+    discourse.get_client().log_stats()
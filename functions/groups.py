@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+
+import util.aws as aws
+import util.db as db
+import util.discourse as discourse
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Ninja, certified and edu, the groups the rest of the project reads IN_GROUP edges for
+SYNCED_GROUP_IDS = [int(group_id) for group_id in os.environ.get("SYNCED_GROUP_IDS", "50,41,49").split(",")]
+GROUP_MEMBERS_PAGE_SIZE = 1000
+GROUP_ADD_CHUNK_SIZE = 50
+
+
+def find_users_groups(event, context):
+    topic_arn = aws.construct_topic_arn(context, aws.STORE_GROUPS_TOPIC)
+
+    sns = aws.client('sns')
+    with db.get_driver().session() as session:
+        rows = session.run(q.users_groups_refresh_query)
+        for row in rows:
+            logger.info(f"row: {row}")
+            username = row["userName"]
+            discourse_id = row["discourseId"]
+
+            message = {"discourseId": discourse_id, "userName": username}
+            sns.publish(TopicArn=topic_arn, Message=json.dumps(message))
+
+
+def store_groups_tx(tx, params):
+    return tx.run(q.store_groups_query, params)
+
+
+def store_groups(event, context):
+    for record in event["Records"]:
+        message = json.loads(record["Sns"]["Message"])
+        discourse_id = message["discourseId"]
+        username = message["userName"]
+        logger.info(f"username: {username}, discourseId: {discourse_id}")
+
+        groups = discourse.get_client("background").user(username).get("groups") or []
+        logger.info(f"user: {username}, discourseId: {discourse_id}, groups: {groups}")
+        with db.get_driver().session() as session:
+            params = {"id": discourse_id, "groups": groups}
+            result = session.write_transaction(store_groups_tx, params)
+            logger.info(f"params: {params}, result: {result.summary().counters}")
+
+
+def missing_groups(event, context):
+    with db.get_driver().session() as session:
+        users = [{"externalId": row["externalId"], "userName": row["userName"], "discourseId": row["discourseId"]}
+                 for row in session.run(q.users_who_passed_query_but_dont_have_group)]
+    logger.info(f"{len(users)} certified users are missing the certification group")
+
+    if users:
+        message = {"users": users, "groupId": discourse.CERTIFICATION_GROUP_ID}
+        aws.client('sns').publish(TopicArn=aws.construct_topic_arn(context, aws.ASSIGN_GROUPS_TOPIC),
+                                  Message=json.dumps(message))
+
+
+def assign_groups(event, context):
+    client = discourse.get_client()
+
+    additions = {}
+    for record in event["Records"]:
+        message = json.loads(record["Sns"]["Message"])
+        # Messages published before users were batched carry a single user
+        for user in message.get("users") or [message]:
+            additions.setdefault(message["groupId"], []).append(user)
+
+    results = {}
+    for group_id, users in additions.items():
+        with db.get_driver().session() as session:
+            certified = {row["externalId"] for row in
+                         session.run(q.certified_users_query, {"externalIds": [user["externalId"] for user in users]})}
+        users = [user for user in users if user["externalId"] in certified]
+
+        members = {member.lower() for member in
+                   client.add_group_members_batched(group_id, [user["userName"] for user in users],
+                                                    chunk_size=GROUP_ADD_CHUNK_SIZE)}
+        added = [user for user in users if user["userName"].lower() in members]
+
+        with db.get_driver().session() as session:
+            params = {"groupId": group_id, "discourseIds": [user["discourseId"] for user in added]}
+            session.write_transaction(lambda tx: tx.run(q.confirm_group_members_query, params).consume())
+
+        failed = [user["userName"] for user in users if user["userName"].lower() not in members]
+        results[group_id] = {"added": [user["userName"] for user in added], "failed": failed}
+        logger.info(f"Group {group_id}: {results[group_id]}")
+
+    client.log_stats()
+    return results
+
+
+def sync_group_members_tx(tx, params):
+    return tx.run(q.sync_group_members_query, params).single()
+
+
+def sync_groups(event, context):
+    client = discourse.get_client("background")
+
+    with db.get_driver().session() as session:
+        groups = session.run(q.synced_groups_query, {"groupIds": SYNCED_GROUP_IDS}).data()
+
+    for group in groups:
+        if not group["name"]:
+            logger.info(f"Skipping group {group['id']}, its name isn't known yet")
+            continue
+
+        # Any failure while paging raises before the write, so a partial member list never removes edges
+        member_ids = [member["id"] for member in client.all_group_members(group["name"], GROUP_MEMBERS_PAGE_SIZE)]
+        with db.get_driver().session() as session:
+            row = session.write_transaction(sync_group_members_tx, {"groupId": group["id"], "memberIds": member_ids})
+        logger.info(f"Group {group['name']}: {len(member_ids)} members, {row['added']} added, {row['removed']} removed")
+
+    client.log_stats()
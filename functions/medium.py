@@ -0,0 +1,94 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
+
+import util.db as db
+import util.discourse as discourse
+import util.queries as q
+
+MEDIUM_PUBLICATION_FEED = "https://medium.com/feed/neo4j"
+MEDIUM_FETCH_WORKERS = 8
+
+discourse_blog_category_id = 122
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def fetch_medium_feed(feed):
+    d = feedparser.parse(feed["url"], etag=feed["etag"], modified=feed["modified"])
+    status = d.get("status")
+    if status == 304:
+        return feed, None
+    if status is None or status >= 400:
+        logger.info(f"Couldn't fetch {feed['url']}: {status} {d.get('bozo_exception')}")
+        return feed, None
+    return {"url": feed["url"], "etag": d.get("etag"), "modified": d.get("modified")}, d.entries
+
+
+def medium_post(entry):
+    date = entry.published_parsed
+    return {
+        "guid": entry.guid,
+        "author": entry.author,
+        "url": entry.link,
+        "title": entry.title,
+        "content": entry.content[0].value,
+        "date": "%d-%02d-%02d" % (date.tm_year, date.tm_mon, date.tm_mday)
+    }
+
+
+def store_medium_posts_tx(tx, posts, feeds):
+    tx.run(q.store_medium_posts_query, {"posts": posts}).consume()
+    tx.run(q.store_medium_feeds_query, {"feeds": feeds}).consume()
+
+
+def fetch_medium_posts(request, context):
+    with db.get_driver().session() as session:
+        feeds = session.read_transaction(
+            lambda tx: tx.run(q.medium_feeds_query, {"publicationFeed": MEDIUM_PUBLICATION_FEED}).data())
+
+    with ThreadPoolExecutor(max_workers=MEDIUM_FETCH_WORKERS) as pool:
+        fetched = list(pool.map(fetch_medium_feed, feeds))
+
+    changed_feeds = [feed for feed, entries in fetched if entries is not None]
+    posts = {entry.guid: medium_post(entry) for _, entries in fetched if entries for entry in entries}
+    logger.info(f"Feeds: {len(feeds)}, changed: {len(changed_feeds)}, entries: {len(posts)}")
+
+    if not changed_feeds:
+        return "No Medium feeds changed"
+
+    with db.get_driver().session() as session:
+        known = set(session.read_transaction(
+            lambda tx: tx.run(q.known_medium_posts_query, {"guids": list(posts.keys())}).single()["guids"]))
+        new_posts = [post for guid, post in posts.items() if guid not in known]
+        session.write_transaction(store_medium_posts_tx, new_posts, changed_feeds)
+
+    return "Stored %d new Medium posts" % (len(new_posts))
+
+
+def post_medium_to_discourse(request, context):
+    counter = 0
+    with db.get_driver().session() as session:
+      result = session.run(q.get_medium_posts_query, {})
+      for record in result:
+        dt = post_topic_to_discourse(discourse_blog_category_id, record['discourse_user'], record['title'], record['content'], record['date'])
+        counter = counter + 1
+        if 'id' in dt:
+          params = {"discourseId": dt['id'], "mediumId": record['guid']}
+          update_res = session.run(q.set_medium_post_posted_query, params)
+          update_res.consume()
+    return "Posted %d posts to discourse" % (counter)
+
+
+def post_topic_to_discourse(category, username, title, body, published_date):
+    post_data = {}
+    post_data['title'] = title
+    post_data['category'] = category
+    post_data['raw'] = body
+    post_data['created_at'] = published_date
+    # The root key lets us create the topic as the Medium author's own Discourse user
+    r = discourse.get_client().create_post(post_data, headers={'Api-Key': discourse.root_api_key(), 'Api-Username': username})
+    print(r.content)
+    return r.json()
@@ -0,0 +1,172 @@
+import datetime
+import json
+import logging
+import time
+
+import util.aws as aws
+import util.db as db
+import util.discourse as discourse
+import util.ninja as n
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Answers imported this long after they were posted are only dated by a full set-answer-effective-dates pass
+ANSWER_EFFECTIVE_DATE_LOOKBACK_SECONDS = 7 * 24 * 60 * 60
+
+
+def poll_ninja_requests(event, context):
+    client = discourse.get_client()
+    group_name = "ninja"
+    group_id = 50
+    mother_of_ninjas = "mark.needham,karin.wolok"
+
+    logger.info("Polling for new requests to join the Ninja Group")
+    response = client.group_members(group_name, requesters=True)
+    members = [{k: v
+                for k, v in m.items() if k in ["id", "name", "username"]}
+               for m in response["members"]]
+    logger.info(f"Found members: {members}")
+
+    for member in members:
+        name = member.get('name')
+        username = member.get('username')
+        with db.get_driver().session() as session:
+            is_certified = session.run(q.did_discourse_user_pass_query, {"discourseUserId": member["id"]}).single()["certified"]
+            if is_certified:
+                logger.info(f"User is certified: {member}")
+                add_to_group_response = client.handle_membership_request(group_id, member["id"], accept=True)
+                logger.info(f"Request processed: {add_to_group_response.json()}")
+
+                client.send_private_message(username,
+                                            "Neo4j Ninja Group Request Accepted",
+                                            n.ninja_acceptance_message(name, username))
+                client.send_private_message(mother_of_ninjas,
+                                            f"Neo4j Ninja Approved: {name or username}",
+                                            n.ninja_approval_owner_message(name, username))
+            else:
+                logger.info(f"User is not certified: {member}")
+                add_to_group_response = client.handle_membership_request(group_id, member["id"], accept=False)
+                logger.info(f"Request processed: {add_to_group_response.json()}")
+
+                client.send_private_message(mother_of_ninjas,
+                                            f"Neo4j Ninja Rejected: {name or username}",
+                                            n.ninja_rejection_owner_message(name, username))
+
+    client.log_stats()
+
+
+def poll_ninja_recommended_questions(event, context):
+    import numpy as np
+    import util.recommendations as recommendations
+
+    now = datetime.datetime.now()
+    week_starting = (now - datetime.timedelta(days=(now.weekday() + 1) % 7)).date()
+
+    with db.get_driver().session() as session:
+        ninjas = [row["u"] for row in session.read_transaction(
+            lambda tx: tx.run(q.find_ninja_to_process, {"weekStarting": week_starting}).data())]
+        if not ninjas:
+            logger.info("Every ninja has had recommendations this week")
+            return
+
+        user_ids = [ninja["id"] for ninja in ninjas]
+        topics = session.read_transaction(lambda tx: tx.run(q.recommendation_candidates_query).data())
+        topic_ids = [topic["topicId"] for topic in topics]
+        affinities = session.read_transaction(
+            lambda tx: [(row["userId"], row["categoryId"], row["count"])
+                        for row in tx.run(q.ninja_category_affinity_query, {"userIds": user_ids})])
+        similar = session.read_transaction(
+            lambda tx: [(row["userId"], row["peerId"], row["score"])
+                        for row in tx.run(q.ninja_similar_answerers_query, {"userIds": user_ids})])
+        recommended = session.read_transaction(
+            lambda tx: [(row["userId"], row["topicId"])
+                        for row in tx.run(q.already_recommended_query, {"userIds": user_ids, "topicIds": topic_ids})])
+    logger.info(f"Scoring {len(topics)} candidate topics for {len(ninjas)} ninjas")
+
+    category_ids = sorted({category_id for topic in topics for category_id in topic["categoryIds"]})
+    category_index = {category_id: i for i, category_id in enumerate(category_ids)}
+    topic_categories = np.zeros((len(topics), len(category_ids)))
+    for i, topic in enumerate(topics):
+        topic_categories[i, [category_index[category_id] for category_id in topic["categoryIds"]]] = 1
+
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    topic_index = {topic_id: i for i, topic_id in enumerate(topic_ids)}
+    excluded = np.zeros((len(ninjas), len(topics)), dtype=bool)
+    for user_id, topic_id in recommended:
+        excluded[user_index[user_id], topic_index[topic_id]] = True
+
+    created_at = np.array([topic["createdAt"].to_native().timestamp() for topic in topics])
+    user_categories = recommendations.top_categories(affinities, user_ids, category_ids)
+    similarity = recommendations.asker_similarity(similar, user_ids, [topic["askerId"] for topic in topics])
+    picks = recommendations.recommend(user_categories, topic_categories, created_at, excluded, similarity)
+
+    picked = {ninja["id"]: [topics[i] for i in row if i >= 0] for ninja, row in zip(ninjas, picks)}
+    with db.get_driver().session() as session:
+        params = {"weekStarting": week_starting,
+                  "recommendations": [{"userId": user_id, "topics": [topic["topicId"] for topic in user_topics]}
+                                      for user_id, user_topics in picked.items()]}
+        response = session.write_transaction(lambda tx: tx.run(q.save_recommendations_query, params).summary().counters)
+        logger.info(f"Stored recommendations for {len(ninjas)} ninjas: {response}")
+
+    # Messages are posted by send_posts so a big batch doesn't run into this function's timeout
+    sns = aws.client('sns')
+    topic_arn = aws.construct_topic_arn(context, aws.POSTS_TOPIC)
+    title = f"Neo4j Ninja questions to answer: {now.strftime('%d %B %Y')}"
+    for ninja in ninjas:
+        user_topics = [{**topic, "link": f"https://community.neo4j.com/t/{topic['topicId']}"}
+                       for topic in picked[ninja["id"]]]
+        logger.info(f"User: {ninja['name']}, recommendations: {[topic['topicId'] for topic in user_topics]}")
+        if user_topics:
+            sns.publish(TopicArn=topic_arn, Message=json.dumps({
+                "archetype": "private_message",
+                "target_recipients": ninja["name"],
+                "title": title,
+                "raw": n.ninja_questions(ninja.get("screenName"), ninja["name"], user_topics),
+                "priority": "scheduled"
+            }))
+
+
+def clear_ninjas_api_cache(months=None):
+    # Closed months are cached without expiry, including any computed before a backfill filled them in
+    query, params = (q.clear_ninjas_api_cache_query, {}) if months is None else \
+        (q.clear_ninjas_api_cache_months_query, {"months": months})
+    with db.get_driver().session() as session:
+        row = session.write_transaction(lambda tx: tx.run(query, params).single())
+    logger.info(f"Cleared {row['cleared']} cached leaderboard months")
+
+
+def backfill_weekly_activity(event, context):
+    with db.get_driver().session() as session:
+        params = {"outer": q.backfill_weekly_activity_posts, "inner": q.weekly_activity_body}
+        row = session.run(q.backfill_weekly_activity_query, params).single()
+        logger.info(f"Backfilled weekly activity: {row['total']} replies in {row['batches']} batches, "
+                    f"errors: {row['errorMessages']}")
+    if row["total"]:
+        clear_ninjas_api_cache()
+
+
+def set_answer_effective_dates(event, context):
+    # The schedule range-seeks recently created answers, invoke with {"full": true} to scan every answer once
+    if (event or {}).get("full"):
+        with db.get_driver().session() as session:
+            row = session.run(q.set_answer_effective_dates_query).single()
+        logger.info(f"Set effectiveDate on {row['total']} answers in {row['batches']} batches, "
+                    f"errors: {row['errorMessages']}")
+        if row["total"]:
+            clear_ninjas_api_cache()
+    else:
+        params = {"since": int(time.time()) - ANSWER_EFFECTIVE_DATE_LOOKBACK_SECONDS}
+        with db.get_driver().session() as session:
+            row = session.write_transaction(lambda tx: tx.run(q.new_answer_effective_dates_query, params).single())
+        logger.info(f"Set effectiveDate on {row['total']} new answers in months {row['months']}")
+        if row["total"]:
+            clear_ninjas_api_cache(row["months"])
+
+
+def backfill_recommendation_answers(event, context):
+    with db.get_driver().session() as session:
+        row = session.run(q.backfill_recommendation_answers_query).single()
+        logger.info(f"Checked {row['total']} recommendations for answers in {row['batches']} batches, "
+                    f"errors: {row['errorMessages']}")
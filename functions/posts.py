@@ -0,0 +1,33 @@
+import json
+import logging
+
+import util.db as db
+import util.ingest as ingest
+
+IMPORT_BATCH_SIZE = 100
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def import_posts_topics_batch(messages):
+    batcher = ingest.ImportBatcher(db.get_driver(), batch_size=IMPORT_BATCH_SIZE)
+    results, invalid = [], []
+    for key, message in messages:
+        try:
+            event_type = message["headers"]["X-Discourse-Event-Type"]
+            json_payload = json.loads(message["body"])
+            importable = ingest.is_importable(event_type, json_payload)
+            if importable:
+                ingest.topic_id(event_type, json_payload)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.info(f"Message {key} is not a valid post or topic event: {e}")
+            invalid.append(key)
+            continue
+        if importable:
+            results += batcher.add(event_type, json_payload, key=key)
+
+    results += batcher.flush()
+    failed = [result["key"] for result in results if not result["ok"]]
+    logger.info(f"Imported {len(results) - len(failed)} events, {len(failed)} failed, {len(invalid)} invalid")
+    return invalid + failed
@@ -0,0 +1,36 @@
+import logging
+import os
+import time
+
+import util.db as db
+import util.queries as q
+import util.similarity as similarity
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SIMILARITY_TOP_K = int(os.environ.get("SIMILARITY_TOP_K", "10"))
+SIMILARITY_WINDOW_DAYS = int(os.environ.get("SIMILARITY_WINDOW_DAYS", "365"))
+SIMILARITY_WRITE_BATCH_SIZE = 1000
+
+
+def compute_answerer_similarity(event, context):
+    computed_at = int(time.time() * 1000)
+
+    with db.get_driver().session() as session:
+        replies = session.read_transaction(
+            lambda tx: [(row["userId"], row["topicId"])
+                        for row in tx.run(q.answerer_topics_query, {"windowDays": SIMILARITY_WINDOW_DAYS})])
+    logger.info(f"Exported {len(replies)} user/topic replies")
+
+    neighbours = similarity.co_answer_similarity(replies, top_k=SIMILARITY_TOP_K)
+    users = [{"userId": user_id, "neighbours": [{"userId": other, "score": score} for other, score in others]}
+             for user_id, others in neighbours.items() if others]
+    logger.info(f"{len(users)} of {len(neighbours)} answerers have similar answerers")
+
+    with db.get_driver().session() as session:
+        for i in range(0, len(users), SIMILARITY_WRITE_BATCH_SIZE):
+            params = {"users": users[i:i + SIMILARITY_WRITE_BATCH_SIZE], "computedAt": computed_at}
+            session.write_transaction(lambda tx: tx.run(q.store_similar_answerers_query, params).consume())
+        session.write_transaction(
+            lambda tx: tx.run(q.remove_stale_similar_answerers_query, {"computedAt": computed_at}).consume())
@@ -0,0 +1,67 @@
+import logging
+import os
+
+from retrying import retry
+
+import util.db as db
+import util.discourse as discourse
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TOPIC_STATS_CATEGORIES = [int(category_id) for category_id in
+                          os.environ.get("TOPIC_STATS_CATEGORIES", "68").split(",")]
+TOPIC_STATS_MAX_PAGES = 100
+
+
+@retry(stop_max_attempt_number=5, wait_random_max=1000)
+def set_update_topics(params):
+    with db.get_driver().session() as session:
+        return session.write_transaction(lambda tx: tx.run(q.update_topics_query, params).single()["changed"])
+
+
+def category_topics(client, category_id):
+    topics = []
+    for page in range(TOPIC_STATS_MAX_PAGES):
+        topic_list = client.category_topics(category_id, page)
+        topics += [topic for topic in topic_list["topics"] if not topic["pinned"]]
+        if not topic_list["topics"] or not topic_list.get("more_topics_url"):
+            break
+    return topics
+
+
+def update_topics(request, context):
+    client = discourse.get_client()
+    for category_id in TOPIC_STATS_CATEGORIES:
+        topics = category_topics(client, category_id)
+        changed = set_update_topics({"params": topics})
+        logger.info(f"Category {category_id}: {len(topics)} topics, {changed} changed")
+    client.log_stats()
+
+
+def update_categories_tx_fn(tx, params):
+    tx.run(tx, params=params)
+
+
+def update_categories(request, context):
+    client = discourse.get_client()
+    categories = client.categories()
+    print(len(categories))
+
+    with db.get_driver().session() as session:
+        result = session.run(q.update_categories_subcategories_query, params=categories)
+        print(result.summary().counters)
+
+    categories = client.site()["categories"]
+
+    with db.get_driver().session() as session:
+        result = session.run(q.update_categories_query, params=categories)
+        print(result.summary().counters)
+
+
+def backfill_topic_post_counts(request, context):
+    with db.get_driver().session() as session:
+        row = session.run(q.backfill_topic_post_counts_query).single()
+        logger.info(f"Counted posts of {row['total']} topics in {row['batches']} batches, "
+                    f"errors: {row['errorMessages']}")
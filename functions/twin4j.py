@@ -0,0 +1,70 @@
+import logging
+import re
+
+import requests
+from bs4 import BeautifulSoup
+from retrying import retry
+
+import util.db as db
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+@retry(stop_max_attempt_number=5, wait_random_max=1000)
+def set_import_twin4j(params):
+    with db.get_driver().session() as session:
+        result = session.run(q.import_twin4j_query, params)
+        print(result.summary().counters)
+        return True
+
+
+def import_twin4j(request, context):
+    twin4j_posts = requests.get("https://neo4j.com/wp-json/wp/v2/posts?tags=3201", timeout=30).json()
+
+    most_recent_post = twin4j_posts[0]
+
+    date = most_recent_post["date"]
+    link = most_recent_post["link"]
+
+    html_content = most_recent_post["content"]["rendered"]
+
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    featured_element = [tag for tag in soup.findAll("h3") if "Featured Community Member" in tag.text][0]
+    match = re.match("Featured Community Members?: (.*)", featured_element.text)
+
+    person = match.groups(1)[0].strip()
+    people = [p.strip() for p in person.split(" and ")]
+
+    if len(people) == 1:
+        link_element = featured_element.find_all_next("a")[:1]
+    else:
+        link_element = featured_element.find_all_next("a")[:2]
+
+    image = featured_element.parent.find_all("img")[0]["src"]
+
+    print("Featured Community Member: ", [(link.text, link["href"]) for link in link_element])
+    summary_text = soup.find_all("div")[2].text.strip()
+
+    all_the_tags = [{"tag": tag.text, "anchor": tag["id"]}
+                    for tag in soup.findAll("h3")
+                    if "Featured Community Member" not in tag.text]
+
+    params = {"people": [{"name": link.text,
+                          "screenName": link["href"].split("/")[-1],
+                          "stackOverflowId": link["href"].split("/")[-2] if "stackoverflow" in link["href"] else -1
+                          }
+                         for link in link_element],
+              "date": date,
+              "image": image,
+              "summaryText": summary_text,
+              "link": link,
+              "allTheTags": all_the_tags}
+
+    print(params)
+
+    set_import_twin4j(params)
+
+    return {"statusCode": 200, "body": "Got the event", "headers": {}}
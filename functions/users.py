@@ -0,0 +1,177 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from retrying import retry
+
+import util.aws as aws
+import util.db as db
+import util.discourse as discourse
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DUPLICATE_SCAN_WINDOW = 5000
+DUPLICATE_CURSOR = "discourse-user-names"
+ADMIN_LOOKUP_WORKERS = 8
+# Stop starting new windows when the Lambda is this close to its timeout
+DUPLICATE_CUTOFF_MS = 60000
+
+
+@retry(stop_max_attempt_number=5, wait_random_max=1000)
+def set_user_events(params):
+    with db.get_driver().session() as session:
+        result = session.run(q.user_events_query, params)
+        print(result.summary().counters)
+        return True
+
+
+def user_events(request, context):
+    headers = request["headers"]
+    event_type = headers["X-Discourse-Event-Type"]
+    event = headers["X-Discourse-Event"]
+    logger.info(f"Received {event_type}: {event}")
+
+    if event_type == "user" and event == "user_created":
+        logger.info("User created so we'll update everything when they login")
+        return {"statusCode": 200, "body": "It was just a user creation event", "headers": {}}
+    elif event_type == "user" and event == "user_destroyed":
+        logger.info("User destroyed so no longer need to care about user")
+        return {"statusCode": 200, "body": "It was just a user destruction event -- no action as dont know reason", "headers": {}}
+
+    body = request["body"]
+    json_payload = json.loads(body)
+    logger.info(f"json: {json_payload}")
+
+    set_user_events({"params": json_payload})
+
+    sns = aws.client('sns')
+    sns.publish(TopicArn=(aws.construct_topic_arn(context, aws.ASSIGN_BADGES_TOPIC)),
+                Message=json.dumps({
+                    "externalId": json_payload["user"]["external_id"],
+                    "userName": json_payload["user"]["username"],
+                    "discourseId": json_payload["user"]["id"],
+                    "badgeId": discourse.CERTIFICATION_BADGE_ID
+                }))
+
+    sns.publish(TopicArn=(aws.construct_topic_arn(context, aws.ASSIGN_GROUPS_TOPIC)),
+                Message=json.dumps({
+                    "externalId": json_payload["user"]["external_id"],
+                    "userName": json_payload["user"]["username"],
+                    "discourseId": json_payload["user"]["id"],
+                    "groupId": discourse.CERTIFICATION_GROUP_ID
+                }))
+
+    return {"statusCode": 200, "body": "Updated user", "headers": {}}
+
+
+def update_profile(request, context):
+    headers = request["headers"]
+    event_type = headers["X-Discourse-Event-Type"]
+    event = headers["X-Discourse-Event"]
+    print(f"Received {event_type}: {event}")
+
+    body = request["body"]
+    json_payload = json.loads(body)
+    print(json_payload)
+
+    post_payload = json_payload.get("post")
+    if event_type == "post" and event in ["post_edited", "post_created"] and post_payload and post_payload.get("post_number") == 1:
+        post = json_payload["post"]
+        username = post["username"]
+        bio = post["cooked"]
+
+        r = discourse.get_client("webhook").update_user(username, {"bio_raw": bio})
+        print(r)
+
+        return {"statusCode": 200, "body": "Updated user bio", "headers": {}}
+    else:
+        return {"statusCode": 200, "body": "No action necessary", "headers": {}}
+
+
+def duplicate_users_query(tx, after):
+    # Walks the names in index order from the cursor, so each run only looks at the next window of users
+    query = """
+    MATCH (me:DiscourseUser)
+    WHERE me.name > $after
+    WITH me.name AS name
+    ORDER BY name
+    LIMIT $window
+    WITH collect(DISTINCT name) AS names
+    RETURN names[-1] AS last,
+           [name IN names | [(dup:DiscourseUser {name: name}) | dup.id]] AS duplicates
+    """
+    row = tx.run(query, after=after, window=DUPLICATE_SCAN_WINDOW).single()
+    return row["last"], [ids for ids in row["duplicates"] if len(ids) > 1]
+
+
+def reconcile_users(tx, renames, missing, cursor):
+    query = """
+    UNWIND $renames AS rename
+    MATCH (u:DiscourseUser {id: rename.id})
+    SET u.name = rename.username
+    WITH count(*) AS renamed
+    UNWIND $missing AS userId
+    MATCH (u:DiscourseUser {id: userId})
+    REMOVE u:DiscourseUser
+    SET u:MissingDiscourseUser
+    """
+    tx.run(query, renames=renames, missing=missing).consume()
+    save_cursor(tx, cursor)
+
+
+def load_cursor(tx):
+    query = """
+    MATCH (cursor:ReconciliationCursor {name: $name})
+    RETURN cursor.value AS value
+    """
+    row = tx.run(query, name=DUPLICATE_CURSOR).single()
+    return row["value"] if row else ""
+
+
+def save_cursor(tx, value):
+    query = """
+    MERGE (cursor:ReconciliationCursor {name: $name})
+    SET cursor.value = $value, cursor.updatedAt = datetime()
+    """
+    tx.run(query, name=DUPLICATE_CURSOR, value=value).consume()
+
+
+def admin_lookup(user_id):
+    try:
+        return user_id, discourse.get_client().admin_user(user_id)
+    except Exception as e:
+        logger.info(f"Couldn't look up user {user_id}: {e}")
+        return user_id, e
+
+
+def clean_up_discourse_users(event, context):
+    with db.get_driver().session() as session:
+        cursor = session.read_transaction(load_cursor)
+
+    with ThreadPoolExecutor(max_workers=ADMIN_LOOKUP_WORKERS) as pool:
+        while context is None or context.get_remaining_time_in_millis() > DUPLICATE_CUTOFF_MS:
+            with db.get_driver().session() as session:
+                last, duplicates = session.read_transaction(lambda tx: duplicate_users_query(tx, cursor))
+
+            ids = [user_id for ids in duplicates for user_id in ids]
+            lookups = list(pool.map(admin_lookup, ids))
+            renames = [{"id": user_id, "username": admin_user["username"]}
+                       for user_id, admin_user in lookups if isinstance(admin_user, dict)]
+            missing = [user_id for user_id, admin_user in lookups if admin_user is None]
+            failed = [user_id for user_id, admin_user in lookups if isinstance(admin_user, Exception)]
+
+            # Start again from the first name once the window runs off the end, and stay put if a lookup failed
+            # so those users are tried again
+            next_cursor = cursor if failed else (last or "")
+            with db.get_driver().session() as session:
+                session.write_transaction(reconcile_users, renames, missing, next_cursor)
+            logger.info(f"Names after '{cursor}': {len(duplicates)} duplicated, {len(renames)} renamed, "
+                        f"{len(missing)} missing, {len(failed)} failed")
+
+            if failed or not last:
+                break
+            cursor = next_cursor
+
+    discourse.get_client().log_stats()
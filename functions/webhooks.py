@@ -0,0 +1,61 @@
+import json
+import logging
+import os
+
+import util.webhooks as webhooks
+import util.work_queue as work_queue
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+webhook_queue = None
+
+
+def get_webhook_queue():
+    global webhook_queue
+    if webhook_queue is None:
+        # No default, a front door without a queue must fail rather than acknowledge events it can't keep
+        webhook_queue = work_queue.queue_from_url(os.environ["WEBHOOK_QUEUE_URL"])
+    return webhook_queue
+
+
+def front_door(route):
+    def acknowledge(request, context):
+        return webhooks.acknowledge(request, route, get_webhook_queue())
+    return acknowledge
+
+
+import_posts_topics = front_door("import_posts_topics")
+community_content = front_door("community_content")
+user_events = front_door("user_events")
+update_profile = front_door("update_profile")
+
+
+def process_webhook_messages(messages, context):
+    # Imported here so the front door Lambdas never load the driver or the Discourse client
+    import functions.community_content
+    import functions.posts
+    import functions.users
+
+    return webhooks.dispatch(messages, {
+        "community_content": lambda request: functions.community_content.community_content(request, context),
+        "user_events": lambda request: functions.users.user_events(request, context),
+        "update_profile": lambda request: functions.users.update_profile(request, context),
+    }, {
+        "import_posts_topics": functions.posts.import_posts_topics_batch
+    })
+
+
+def process_webhooks(event, context):
+    messages = [(record["messageId"], json.loads(record["body"])) for record in event["Records"]]
+    failed = process_webhook_messages(messages, context)
+
+    # Only the failed messages go back on the queue, the rest of the batch is acknowledged
+    return {"batchItemFailures": [{"itemIdentifier": key} for key in failed]}
+
+
+def drain_webhooks(event, context):
+    processed, failed = webhooks.drain(get_webhook_queue(),
+                                       lambda messages: process_webhook_messages(messages, context),
+                                       batch_size=event.get("batchSize", 10) if event else 10)
+    return f"Processed {processed} webhook events, {failed} failed"
@@ -0,0 +1,11 @@
+import json
+
+import api
+
+
+def test_recommendation_effectiveness_rejects_bad_parameters():
+    for qs in [{"page": "two"}, {"pageSize": "1.5"}, {"week": "last week"}, {"week": "2020-02-30"}]:
+        response = api.recommendation_effectiveness({"queryStringParameters": qs}, None)
+
+        assert response["statusCode"] == 400
+        assert "error" in json.loads(response["body"])
@@ -0,0 +1,34 @@
+import backfill
+
+
+class FakeFetcher:
+    def topic_ids(self, page):
+        return ([1, 2, 3], False) if page == 0 else ([], False)
+
+    def topic(self, topic_id):
+        if topic_id == 2:
+            raise RuntimeError("403 Forbidden")
+        topic = {"id": topic_id, "title": "t", "slug": "t", "archetype": "regular", "created_at": "2020-01-01",
+                 "category_id": 1}
+        return topic, []
+
+
+class FakeBatcher:
+    def __init__(self, driver, batch_size, flush_interval_ms):
+        self.keys = []
+
+    def add(self, event_type, payload, key=None):
+        self.keys.append(key)
+        return []
+
+    def flush(self):
+        return [{"key": key, "ok": key != 3} for key in self.keys]
+
+
+def test_backfill_records_failed_topics_and_keeps_going(monkeypatch, tmp_path):
+    monkeypatch.setattr(backfill.ingest, "ImportBatcher", FakeBatcher)
+
+    checkpoint = backfill.backfill(FakeFetcher(), None, str(tmp_path / "checkpoint.json"), workers=2)
+
+    assert checkpoint == {"page": 0, "failed": [2, 3]}
+    assert backfill.load_checkpoint(str(tmp_path / "checkpoint.json")) == checkpoint
@@ -0,0 +1,34 @@
+import pytest
+
+import util.budget as budget
+
+
+def test_priorities_leave_their_reserve():
+    api_budget = budget.ApiBudget(budget.LocalBudgetStore(), per_minute=1, capacity=4)
+
+    api_budget.acquire("background")
+    api_budget.acquire("background")
+    with pytest.raises(budget.BudgetExhausted):
+        api_budget.acquire("background")
+
+    api_budget.acquire("scheduled")
+    api_budget.acquire("webhook")
+
+
+def test_acquire_raises_when_the_wait_is_too_long():
+    api_budget = budget.ApiBudget(budget.LocalBudgetStore(), per_minute=1, capacity=1)
+
+    api_budget.acquire("webhook")
+    with pytest.raises(budget.BudgetExhausted):
+        api_budget.acquire("webhook")
+
+
+def test_bucket_refills_up_to_capacity(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(budget.time, "monotonic", lambda: now[0])
+    store = budget.LocalBudgetStore()
+
+    assert store.take("api", 2, 2, 1.0, 0) == (True, 2.0)
+    assert store.take("api", 1, 2, 1.0, 0) == (False, 0.0)
+    now[0] += 10
+    assert store.take("api", 1, 2, 1.0, 0) == (True, 2.0)
@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import util.budget as budget
+import util.discourse as discourse
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.ok = status_code < 400
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append(kwargs)
+        return self.responses.pop(0)
+
+
+def client(responses):
+    c = discourse.DiscourseClient(base_url="http://discourse", backoff_seconds=0)
+    c.session = FakeSession(responses)
+    return c
+
+
+def test_request_retries_rate_limited_posts():
+    c = client([FakeResponse(429), FakeResponse(200)])
+
+    assert c.request("POST", "/posts.json").status_code == 200
+    assert len(c.session.calls) == 2
+
+
+def test_request_does_not_wait_past_deadline():
+    c = client([FakeResponse(429, {"Retry-After": "30"}), FakeResponse(200)])
+
+    response = c.request("POST", "/invites", deadline=time.monotonic() + 1)
+
+    assert response.status_code == 429
+    assert len(c.session.calls) == 1
+    connect, read = c.session.calls[0]["timeout"]
+    assert connect <= 1 and read <= 1
+
+
+def test_request_raises_once_deadline_passed():
+    c = client([FakeResponse(200)])
+
+    with pytest.raises(discourse.DeadlineExceeded):
+        c.request("POST", "/invites", deadline=time.monotonic() - 1)
+    assert c.session.calls == []
+
+
+def budgeted_client(responses):
+    c = client(responses)
+    c.api_budget = budget.ApiBudget(budget.LocalBudgetStore(), per_minute=60, capacity=4)
+    return c
+
+
+def test_request_past_deadline_does_not_spend_budget():
+    c = budgeted_client([FakeResponse(200)])
+
+    with pytest.raises(discourse.DeadlineExceeded):
+        c.request("POST", "/invites", deadline=time.monotonic() - 1)
+    assert c.api_budget.store.take("discourse", 0, 4, 1.0, 0)[1] == pytest.approx(4, abs=0.1)
+
+
+def test_budget_wait_is_capped_by_deadline():
+    c = budgeted_client([FakeResponse(200)] * 4)
+    for _ in range(3):
+        c.request("POST", "/invites")
+
+    start = time.monotonic()
+    with pytest.raises(budget.BudgetExhausted):
+        c.request("POST", "/invites", deadline=start + 0.5)
+    assert time.monotonic() - start < 0.5
+    assert len(c.session.calls) == 3
+
+
+def test_get_client_creates_one_client_per_priority_across_threads(monkeypatch):
+    monkeypatch.setattr(discourse, "clients", {})
+    monkeypatch.setattr(discourse, "api_key", lambda: time.sleep(0.01) or "key")
+    monkeypatch.setattr(discourse, "api_user", lambda: "system")
+    monkeypatch.setattr(budget, "get_budget", lambda: None)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        created = set(map(id, pool.map(lambda _: discourse.get_client("background"), range(16))))
+
+    assert len(created) == 1
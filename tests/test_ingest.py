@@ -0,0 +1,74 @@
+import util.ingest as ingest
+
+
+class FakeResult:
+    def summary(self):
+        return self
+
+    counters = {}
+
+    def consume(self):
+        return self
+
+
+class FakeDriver:
+    def __init__(self):
+        self.runs = []
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def write_transaction(self, work):
+        return work(self)
+
+    def run(self, query, params):
+        payloads = params.get("events") or [params["params"]]
+        if any(payload.get("bad") for payload in payloads):
+            raise ValueError("bad payload")
+        self.runs.append((query, payloads))
+        return FakeResult()
+
+
+def post(topic_id, **fields):
+    return {"post": {"topic_id": topic_id, "topic_archetype": "regular"}, **fields}
+
+
+def topic(topic_id):
+    return {"topic": {"id": topic_id, "archetype": "regular"}}
+
+
+def test_batcher_flushes_at_batch_size_topics_first():
+    driver = FakeDriver()
+    batcher = ingest.ImportBatcher(driver, batch_size=3, flush_interval_ms=10 ** 9)
+
+    assert batcher.add("post", post(2), key="a") == []
+    assert batcher.add("post", post(1), key="b") == []
+    results = batcher.add("topic", topic(1), key="c")
+
+    assert [result["key"] for result in results] == ["c", "b", "a"]
+    assert [query for query, _ in driver.runs] == [ingest.BATCH_QUERIES["topic"], ingest.BATCH_QUERIES["post"]]
+    assert batcher.flush() == []
+
+
+def test_batcher_retries_failed_batch_one_by_one():
+    driver = FakeDriver()
+    batcher = ingest.ImportBatcher(driver, batch_size=10)
+    batcher.add("post", post(1), key="good")
+    batcher.add("post", post(2, bad=True), key="bad")
+
+    results = {result["key"]: result["ok"] for result in batcher.flush()}
+
+    assert results == {"good": True, "bad": False}
+    assert [query for query, _ in driver.runs] == [ingest.SINGLE_QUERIES["post"]]
+
+
+def test_is_importable_only_takes_regular_topics():
+    assert ingest.is_importable("topic", topic(1))
+    assert not ingest.is_importable("post", {"post": {"topic_archetype": "private_message"}})
+    assert not ingest.is_importable("user", {})
@@ -0,0 +1,45 @@
+import functions.ninjas as ninjas
+import util.queries as q
+
+
+class FakeDriver:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def write_transaction(self, work):
+        return work(self)
+
+    def run(self, query, params=None):
+        self.queries.append((query, params))
+        return self
+
+    def single(self):
+        return self.rows.get(self.queries[-1][0], {"cleared": 0})
+
+
+def test_effective_dates_clear_only_the_months_they_changed(monkeypatch):
+    driver = FakeDriver({q.new_answer_effective_dates_query: {"total": 2, "months": ["2020-05"]}})
+    monkeypatch.setattr(ninjas.db, "get_driver", lambda: driver)
+
+    ninjas.set_answer_effective_dates({}, None)
+
+    assert driver.queries[-1] == (q.clear_ninjas_api_cache_months_query, {"months": ["2020-05"]})
+
+
+def test_effective_dates_leave_the_cache_alone_when_nothing_changed(monkeypatch):
+    driver = FakeDriver({q.new_answer_effective_dates_query: {"total": 0, "months": []}})
+    monkeypatch.setattr(ninjas.db, "get_driver", lambda: driver)
+
+    ninjas.set_answer_effective_dates({}, None)
+
+    assert [query for query, _ in driver.queries] == [q.new_answer_effective_dates_query]
@@ -0,0 +1,63 @@
+import numpy as np
+
+import util.recommendations as recommendations
+
+
+def test_top_categories_ranks_over_all_affinities():
+    affinities = [(1, category_id, 100) for category_id in range(1, 6)] + [(1, 9, 1)]
+
+    top = recommendations.top_categories(affinities, [1], [3, 9])
+
+    assert top.tolist() == [[1, 0]]
+
+
+def test_top_categories_limit_and_unknown_users():
+    affinities = [(1, 10, 5), (1, 11, 2), (2, 12, 1)]
+
+    top = recommendations.top_categories(affinities, [1, 2, 3], [10, 11, 12], limit=1)
+
+    assert top.tolist() == [[1, 0, 0], [0, 0, 1], [0, 0, 0]]
+
+
+def test_asker_similarity_scores_topics_by_asker():
+    scores = recommendations.asker_similarity([(7, 99, 0.8), (8, 99, 0.1)], [7], [5, 99, 99])
+
+    assert scores.tolist() == [[0, 0.8, 0.8]]
+
+
+def test_recommend_prefers_category_matches_then_newest():
+    user_categories = np.array([[1.0, 0.0]])
+    topic_categories = np.array([[0, 1], [1, 0], [0, 1], [0, 1]], dtype=float)
+    created_at = np.array([1.0, 2.0, 3.0, 4.0])
+    excluded = np.zeros((1, 4), dtype=bool)
+
+    picks = recommendations.recommend(user_categories, topic_categories, created_at, excluded,
+                                      rng=np.random.default_rng(0))
+
+    assert picks.tolist() == [[1, 3, 2]]
+
+
+def test_recommend_ranks_similar_askers_first():
+    user_categories = np.array([[1.0, 0.0]])
+    topic_categories = np.array([[1, 0], [0, 1], [1, 0]], dtype=float)
+    similarity = np.array([[0.0, 0.9, 0.0]])
+    excluded = np.zeros((1, 3), dtype=bool)
+
+    picks = recommendations.recommend(user_categories, topic_categories, np.array([1.0, 2.0, 3.0]), excluded,
+                                      similarity, per_user=1, rng=np.random.default_rng(0))
+
+    assert picks.tolist() == [[1]]
+
+
+def test_recommend_skips_excluded_and_pads():
+    excluded = np.array([[True, False]])
+
+    picks = recommendations.recommend(np.zeros((1, 1)), np.zeros((2, 1)), np.array([1.0, 2.0]), excluded)
+
+    assert picks.tolist() == [[1, -1, -1]]
+
+
+def test_recommend_without_topics():
+    picks = recommendations.recommend(np.zeros((2, 0)), np.zeros((0, 0)), np.array([]), np.zeros((2, 0), bool))
+
+    assert picks.tolist() == [[-1, -1, -1], [-1, -1, -1]]
@@ -0,0 +1,31 @@
+import pytest
+
+import util.similarity as similarity
+
+
+def test_co_answer_similarity_is_cosine_of_shared_topics():
+    replies = [(1, 10), (1, 11), (2, 10), (2, 11), (3, 10), (4, 12)]
+
+    neighbours = similarity.co_answer_similarity(replies)
+
+    assert [user_id for user_id, _ in neighbours[1]] == [2, 3]
+    assert neighbours[1][0][1] == pytest.approx(1.0)
+    assert neighbours[1][1][1] == pytest.approx(1 / 2 ** 0.5)
+    assert neighbours[4] == []
+
+
+def test_co_answer_similarity_top_k_and_min_score():
+    replies = [(1, 10), (1, 11), (2, 10), (2, 11), (3, 10)]
+
+    assert [user_id for user_id, _ in similarity.co_answer_similarity(replies, top_k=1)[1]] == [2]
+    assert similarity.co_answer_similarity(replies, min_score=0.9)[3] == []
+
+
+def test_co_answer_similarity_counts_repeat_replies_once():
+    neighbours = similarity.co_answer_similarity([(1, 10), (1, 10), (2, 10)])
+
+    assert neighbours[1][0][1] == pytest.approx(1.0)
+
+
+def test_co_answer_similarity_without_replies():
+    assert similarity.co_answer_similarity([]) == {}
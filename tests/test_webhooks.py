@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import functions.posts as posts
+import functions.webhooks
+import util.webhooks as webhooks
+
+
+def message(route, body, event_type="post"):
+    return {"route": route, "headers": {"X-Discourse-Event-Type": event_type, "X-Discourse-Event": "post_created"},
+            "body": body}
+
+
+def test_dispatch_fails_batch_when_processor_raises():
+    def process_batch(batch):
+        raise KeyError("post")
+
+    processed = []
+    messages = [("a", message("posts", "{}")), ("b", message("posts", "{}")), ("c", message("other", "{}"))]
+
+    failed = webhooks.dispatch(messages, {"other": processed.append}, {"posts": process_batch})
+
+    assert failed == ["a", "b"]
+    assert len(processed) == 1
+
+
+def test_dispatch_collects_single_failures():
+    def process(request):
+        raise ValueError("bad")
+
+    failed = webhooks.dispatch([("a", message("other", "{}")), ("b", message("unknown", "{}"))], {"other": process})
+
+    assert failed == ["a"]
+
+
+class FakeBatcher:
+    def __init__(self, driver, batch_size):
+        self.added = []
+
+    def add(self, event_type, payload, key=None):
+        self.added.append(key)
+        return []
+
+    def flush(self):
+        return [{"key": key, "ok": True} for key in self.added]
+
+
+def test_import_batch_returns_malformed_messages_as_failed(monkeypatch):
+    monkeypatch.setattr(posts.db, "get_driver", lambda: None)
+    monkeypatch.setattr(posts.ingest, "ImportBatcher", FakeBatcher)
+    good = json.dumps({"post": {"topic_archetype": "regular", "topic_id": 1}})
+    private = json.dumps({"post": {"topic_archetype": "private_message", "topic_id": 2}})
+    messages = [("good", message("posts", good)),
+                ("private", message("posts", private)),
+                ("no-topic", message("posts", json.dumps({"post": {"topic_archetype": "regular"}}))),
+                ("no-post", message("posts", json.dumps({"topic": {}}))),
+                ("not-json", message("posts", "{")),
+                ("no-headers", {"route": "posts", "body": good})]
+
+    failed = posts.import_posts_topics_batch(messages)
+
+    assert failed == ["no-topic", "no-post", "not-json", "no-headers"]
+
+
+def test_front_door_requires_a_queue_url(monkeypatch):
+    monkeypatch.setattr(functions.webhooks, "webhook_queue", None)
+    monkeypatch.delenv("WEBHOOK_QUEUE_URL", raising=False)
+    request = {"headers": {"X-Discourse-Event-Type": "post", "X-Discourse-Event": "post_created"}, "body": "{}"}
+
+    with pytest.raises(KeyError):
+        functions.webhooks.import_posts_topics(request, None)
+
+    monkeypatch.setenv("WEBHOOK_QUEUE_URL", "memory://test-front-door")
+    assert functions.webhooks.import_posts_topics(request, None)["statusCode"] == 200
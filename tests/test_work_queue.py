@@ -0,0 +1,40 @@
+import pytest
+
+import util.webhooks as webhooks
+import util.work_queue as work_queue
+
+
+@pytest.fixture(params=["memory", "file"])
+def queue(request, tmp_path):
+    if request.param == "file":
+        return work_queue.FileQueue(str(tmp_path / "queue"))
+    return work_queue.MemoryQueue()
+
+
+def test_queue_delivers_in_order_and_releases(queue):
+    for i in range(3):
+        queue.send({"n": i})
+
+    batch = queue.receive(2)
+    assert [message["n"] for _, message in batch] == [0, 1]
+
+    queue.delete([batch[0][0]])
+    queue.release([batch[1][0]])
+    assert sorted(message["n"] for _, message in queue.receive(10)) == [1, 2]
+    assert queue.receive(10) == []
+
+
+def test_drain_stops_after_failures(queue):
+    for i in range(5):
+        queue.send({"n": i})
+
+    def process(messages):
+        return [key for key, message in messages if message["n"] == 3]
+
+    assert webhooks.drain(queue, process, batch_size=2) == (3, 1)
+    assert sorted(message["n"] for _, message in queue.receive(10)) == [3, 4]
+
+
+def test_queue_from_url_shares_memory_queues():
+    assert work_queue.queue_from_url("memory://a") is work_queue.queue_from_url("memory://a")
+    assert work_queue.queue_from_url("memory://a") is not work_queue.queue_from_url("memory://b")
@@ -0,0 +1,22 @@
+import functools
+
+ASSIGN_BADGES_TOPIC = "Discourse-Badges"
+STORE_BADGES_TOPIC = "Store-Discourse-Badges"
+
+ASSIGN_GROUPS_TOPIC = "Discourse-Groups"
+STORE_GROUPS_TOPIC = "Store-Discourse-Groups"
+
+POSTS_TOPIC = "Discourse-Posts"
+
+
+@functools.lru_cache(maxsize=None)
+def client(service, region_name=None):
+    import boto3
+    return boto3.client(service, region_name=region_name)
+
+
+def construct_topic_arn(context, topic):
+    context_parts = context.invoked_function_arn.split(':')
+    region = context_parts[3]
+    account_id = context_parts[4]
+    return f"arn:aws:sns:{region}:{account_id}:{topic}"
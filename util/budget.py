@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+import time
+
+import util.queries as q
+
+logger = logging.getLogger()
+
+# Share of the bucket each pipeline has to leave for the ones above it, so a background refresh can never
+# starve a webhook of API calls
+RESERVES = {
+    "webhook": 0.0,
+    "scheduled": 0.25,
+    "background": 0.5,
+}
+
+MAX_WAIT_SECONDS = {
+    "webhook": 20,
+    "scheduled": 10,
+    "background": 2,
+}
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class LocalBudgetStore:
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, name, cost, capacity, refill_per_second, floor):
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated_at = self.buckets.get(name, (float(capacity), now))
+            available = min(float(capacity), tokens + (now - updated_at) * refill_per_second)
+            granted = available - cost >= floor
+            self.buckets[name] = (available - cost if granted else available, now)
+            return granted, available
+
+
+class Neo4jBudgetStore:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def take(self, name, cost, capacity, refill_per_second, floor):
+        params = {"name": name, "cost": cost, "capacity": capacity, "refillPerMs": refill_per_second / 1000,
+                  "floor": floor}
+        with self.driver.session() as session:
+            row = session.write_transaction(lambda tx: tx.run(q.take_api_budget_query, params).single())
+        return row["granted"], row["available"]
+
+
+class ApiBudget:
+    def __init__(self, store, name="discourse", per_minute=60, capacity=None):
+        self.store = store
+        self.name = name
+        self.refill_per_second = per_minute / 60
+        self.capacity = capacity or per_minute
+
+    def acquire(self, priority, cost=1, deadline=None):
+        # deadline is a time.monotonic() value the caller has to be done by, which can cut the wait short
+        floor = self.capacity * RESERVES[priority]
+        deadline = min(time.monotonic() + MAX_WAIT_SECONDS[priority], deadline or float("inf"))
+        while True:
+            granted, available = self.store.take(self.name, cost, self.capacity, self.refill_per_second, floor)
+            if granted:
+                return
+
+            wait = (floor + cost - available) / self.refill_per_second
+            if time.monotonic() + wait > deadline:
+                raise BudgetExhausted(f"No {priority} API budget left: {available:.1f} of {self.capacity} tokens")
+            logger.info(f"Waiting {wait:.1f}s for {priority} API budget")
+            time.sleep(wait)
+
+
+budget = None
+budget_lock = threading.Lock()
+
+
+def get_budget():
+    global budget
+    with budget_lock:
+        if budget is None:
+            per_minute = int(os.environ.get("DISCOURSE_API_BUDGET_PER_MINUTE", "60"))
+            if os.environ.get("DISCOURSE_API_BUDGET_STORE", "neo4j") == "local":
+                store = LocalBudgetStore()
+            else:
+                import util.db as db
+                store = Neo4jBudgetStore(db.get_driver())
+            budget = ApiBudget(store, per_minute=per_minute)
+        return budget
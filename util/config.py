@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+
+import util.aws as aws
+
+PARAMETERS = [
+    'com.neo4j.graphacademy.dbhostport',
+    'com.neo4j.graphacademy.dbuser',
+    'com.neo4j.graphacademy.dbpassword',
+    'com.neo4j.devrel.discourse.apikey',
+    'com.neo4j.devrel.discourse.apiusername',
+    'com.neo4j.devrel.discourse.rootapikey',
+]
+
+TTL_SECONDS = int(os.environ.get("CONFIG_TTL_SECONDS", "900"))
+
+cache = {}
+lock = threading.Lock()
+
+
+def cached(key, load, ttl=TTL_SECONDS):
+    with lock:
+        entry = cache.get(key)
+        if entry and time.monotonic() - entry[1] < ttl:
+            return entry[0]
+
+    value = load()
+    with lock:
+        cache[key] = (value, time.monotonic())
+    return value
+
+
+def local_params():
+    # CONFIG_FILE points at a JSON object of parameter name -> value, handy for tests and local runs.
+    # Individual parameters can also be set as environment variables, e.g. COM_NEO4J_GRAPHACADEMY_DBUSER.
+    params = {}
+    if os.environ.get("CONFIG_FILE"):
+        with open(os.environ["CONFIG_FILE"]) as config_file:
+            params.update(json.load(config_file))
+    for key in PARAMETERS:
+        env_key = key.upper().replace(".", "_")
+        if env_key in os.environ:
+            params[key] = os.environ[env_key]
+    return params
+
+
+def load_params():
+    params = local_params()
+    missing = [key for key in PARAMETERS if key not in params]
+    if missing:
+        # GetParameters takes up to 10 names, so every secret we use arrives in a single round trip
+        resp = aws.client('ssm', region_name="us-east-1").get_parameters(Names=missing, WithDecryption=True)
+        params.update({p['Name']: p['Value'] for p in resp['Parameters']})
+    return params
+
+
+def get_ssm_param(key):
+    params = cached("ssm", load_params)
+    if key not in params:
+        raise KeyError(f"Parameter {key} isn't configured")
+    return params[key]
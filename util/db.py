@@ -0,0 +1,15 @@
+import util.config as config
+
+db_driver = None
+
+
+def get_driver():
+    global db_driver
+    if db_driver is None:
+        from neo4j import GraphDatabase
+
+        host_port = config.get_ssm_param('com.neo4j.graphacademy.dbhostport')
+        user = config.get_ssm_param('com.neo4j.graphacademy.dbuser')
+        password = config.get_ssm_param('com.neo4j.graphacademy.dbpassword')
+        db_driver = GraphDatabase.driver(f"neo4j://{host_port}", auth=(user, password), max_retry_time=15)
+    return db_driver
@@ -0,0 +1,247 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import util.budget as budget
+import util.config as config
+
+logger = logging.getLogger()
+
+BASE_URL = "https://community.neo4j.com"
+
+CERTIFICATION_BADGE_ID = "103"
+CERTIFICATION_GROUP_ID = "41"
+
+RETRY_STATUS_CODES = [429, 502, 503, 504]
+
+# A 429 means Discourse didn't act on the request, but a POST that failed any other way may already have
+# created something, so only idempotent methods are retried on server and connection errors
+IDEMPOTENT_METHODS = ["GET", "PUT", "DELETE"]
+
+
+def api_key():
+    return config.get_ssm_param('com.neo4j.devrel.discourse.apikey')
+
+
+def api_user():
+    return config.get_ssm_param('com.neo4j.devrel.discourse.apiusername')
+
+
+def root_api_key():
+    return config.get_ssm_param('com.neo4j.devrel.discourse.rootapikey')
+
+
+class DiscourseApiError(Exception):
+    def __init__(self, response):
+        super().__init__(f"{response.request.method} {response.url} -> {response.status_code}: {response.text[:200]}")
+        self.response = response
+        self.status_code = response.status_code
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class DiscourseClient:
+    def __init__(self, base_url=BASE_URL, api_key=None, api_user=None, timeout=(5, 20), max_retries=4,
+                 backoff_seconds=1.0, max_wait_seconds=30, pool_size=20, api_budget=None, priority="scheduled"):
+        self.base_url = base_url
+        self.api_budget = api_budget
+        self.priority = priority
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_wait_seconds = max_wait_seconds
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if api_key:
+            self.session.headers.update({'Api-Key': api_key, 'Api-Username': api_user})
+
+        self.stats = {"calls": 0, "retries": 0, "latency_ms": 0.0}
+        self.stats_lock = threading.Lock()
+
+    def should_retry(self, method, status_code):
+        if status_code == 429:
+            return True
+        return status_code in RETRY_STATUS_CODES and method in IDEMPOTENT_METHODS
+
+    def retry_wait(self, response, attempt):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_wait_seconds)
+            except ValueError:
+                pass
+        return min(self.backoff_seconds * 2 ** attempt + random.uniform(0, self.backoff_seconds), self.max_wait_seconds)
+
+    def request(self, method, path, deadline=None, **kwargs):
+        # deadline is a time.monotonic() value that no attempt, retry wait or socket timeout may run past
+        timeout = kwargs.pop("timeout", self.timeout)
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        start = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            if deadline is not None:
+                self.remaining(method, path, deadline, start, attempt)
+            if self.api_budget:
+                self.api_budget.acquire(self.priority, deadline=deadline)
+            kwargs["timeout"] = timeout
+            if deadline is not None:
+                remaining = self.remaining(method, path, deadline, start, attempt)
+                kwargs["timeout"] = tuple(min(t, remaining) for t in timeout) \
+                    if isinstance(timeout, tuple) else min(timeout, remaining)
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if not self.should_retry(method, response.status_code) or attempt == self.max_retries:
+                    break
+            except (requests.ConnectionError, requests.Timeout):
+                if method not in IDEMPOTENT_METHODS or attempt == self.max_retries:
+                    self.record(method, path, None, start, attempt)
+                    raise
+
+            wait = self.retry_wait(response, attempt)
+            if deadline is not None and time.monotonic() + wait >= deadline:
+                if response is None:
+                    self.record(method, path, None, start, attempt)
+                    raise DeadlineExceeded(f"{method} {path} has no time left to retry")
+                break
+            logger.info(f"{method} {path} -> {response.status_code if response is not None else 'error'}, "
+                        f"retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+        self.record(method, path, response.status_code, start, attempt)
+        return response
+
+    def remaining(self, method, path, deadline, start, attempt):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.record(method, path, None, start, attempt)
+            raise DeadlineExceeded(f"{method} {path} ran out of time after {attempt} attempts")
+        return remaining
+
+    def record(self, method, path, status_code, start, retries):
+        latency_ms = (time.perf_counter() - start) * 1000
+        with self.stats_lock:
+            self.stats["calls"] += 1
+            self.stats["retries"] += retries
+            self.stats["latency_ms"] += latency_ms
+        logger.info(f"{method} {path} -> {status_code} in {latency_ms:.0f}ms ({retries} retries)")
+
+    def get_json(self, path, params=None):
+        response = self.request("GET", path, params=params)
+        if not response.ok:
+            raise DiscourseApiError(response)
+        return response.json()
+
+    def user(self, username):
+        return self.get_json(f"/users/{username}.json").get("user", {})
+
+    def user_badges(self, username):
+        return self.get_json(f"/user-badges/{username}.json").get("badges") or []
+
+    def admin_user(self, user_id):
+        response = self.request("GET", f"/admin/users/{user_id}.json")
+        if response.status_code == 404:
+            return None
+        if not response.ok:
+            raise DiscourseApiError(response)
+        return response.json()
+
+    def group_members(self, group_name, requesters=False, offset=0, limit=50):
+        params = {"offset": offset, "limit": limit}
+        if requesters:
+            params["requesters"] = "true"
+        return self.get_json(f"/groups/{group_name}/members.json", params)
+
+    def all_group_members(self, group_name, page_size=1000):
+        members = []
+        while True:
+            response = self.group_members(group_name, offset=len(members), limit=page_size)
+            page = response.get("members") or []
+            members += page
+            if not page or len(members) >= response.get("meta", {}).get("total", 0):
+                return members
+
+    def categories(self):
+        return self.get_json("/categories.json")["category_list"]["categories"]
+
+    def site(self):
+        return self.get_json("/site.json")
+
+    def category_topics(self, category_id, page=0):
+        return self.get_json(f"/c/{category_id}.json", {"page": page})["topic_list"]
+
+    def add_group_members(self, group_id, usernames):
+        return self.request("PUT", f"/groups/{group_id}/members.json", data={"usernames": ",".join(usernames)})
+
+    def add_group_members_batched(self, group_id, usernames, chunk_size=50):
+        # Returns the usernames that are members afterwards. Discourse rejects a whole PUT with a 422 if any of its
+        # users already belongs to the group, so a rejected chunk is retried one user at a time.
+        members = set()
+        for i in range(0, len(usernames), chunk_size):
+            chunk = usernames[i:i + chunk_size]
+            response = self.add_group_members(group_id, chunk)
+            if response.ok:
+                members.update(response.json().get("usernames") or chunk)
+            elif len(chunk) > 1 and response.status_code == 422:
+                members.update(self.add_group_members_batched(group_id, chunk, chunk_size=1))
+            elif response.status_code == 422 and "already" in response.text:
+                members.update(chunk)
+            else:
+                logger.info(f"Couldn't add {chunk} to group {group_id}: {response.status_code} {response.text[:200]}")
+        return members
+
+    def handle_membership_request(self, group_id, user_id, accept):
+        payload = {"user_id": user_id}
+        if accept:
+            payload["accept"] = True
+        return self.request("PUT", f"/groups/{group_id}/handle_membership_request.json", json=payload)
+
+    def grant_badge(self, username, badge_id):
+        return self.request("POST", "/user_badges.json", data={"username": username, "badge_id": badge_id})
+
+    def invite(self, email, group_names, custom_message, deadline=None):
+        return self.request("POST", "/invites", deadline=deadline,
+                            data={"email": email, "group_names": group_names, "custom_message": custom_message})
+
+    def update_user(self, username, fields):
+        return self.request("PUT", f"/users/{username}.json", data=fields)
+
+    def create_post(self, payload, headers=None):
+        return self.request("POST", "/posts.json", json=payload, headers=headers)
+
+    def send_private_message(self, target_recipients, title, raw):
+        response = self.create_post({
+            "archetype": "private_message",
+            "target_recipients": target_recipients,
+            "title": title,
+            "raw": raw
+        })
+        logger.info(f"response: {response.json()}")
+        return response
+
+    def log_stats(self):
+        calls = self.stats["calls"]
+        average = self.stats["latency_ms"] / calls if calls else 0
+        logger.info(f"Discourse API: {calls} calls, {self.stats['retries']} retries, {average:.0f}ms average latency")
+
+
+clients = {}
+# First calls often come from inside a thread pool, and every caller has to share one client's session and stats
+clients_lock = threading.Lock()
+
+
+def get_client(priority="scheduled"):
+    with clients_lock:
+        if priority not in clients:
+            clients[priority] = DiscourseClient(api_key=api_key(), api_user=api_user(),
+                                                api_budget=budget.get_budget(), priority=priority)
+        return clients[priority]
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+
+import util.queries as q
+
+logger = logging.getLogger()
+
+BATCH_QUERIES = {
+    "post": q.import_posts_batch_query,
+    "topic": q.import_topics_batch_query,
+}
+
+SINGLE_QUERIES = {
+    "post": q.import_post_query,
+    "topic": q.import_topic_query,
+}
+
+
+def is_importable(event_type, payload):
+    if event_type == "topic":
+        return payload["topic"]["archetype"] == "regular"
+    if event_type == "post":
+        return payload["post"]["topic_archetype"] == "regular"
+    return False
+
+
+def topic_id(event_type, payload):
+    return payload["topic"]["id"] if event_type == "topic" else payload["post"]["topic_id"]
+
+
+class ImportBatcher:
+    def __init__(self, driver, batch_size=100, flush_interval_ms=500, on_result=None):
+        self.driver = driver
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.on_result = on_result
+        self.pending = []
+        self.oldest = None
+        self.lock = threading.Lock()
+
+    def add(self, event_type, payload, key=None):
+        with self.lock:
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.pending.append({"key": key, "type": event_type, "payload": payload})
+            due = len(self.pending) >= self.batch_size or self.age_ms() >= self.flush_interval_ms
+
+        return self.flush() if due else []
+
+    def age_ms(self):
+        return 0 if self.oldest is None else (time.monotonic() - self.oldest) * 1000
+
+    def flush(self):
+        with self.lock:
+            events, self.pending, self.oldest = self.pending, [], None
+
+        results = []
+        # Topics go first so that posts in the same batch find their topic's category already linked
+        for event_type in ["topic", "post"]:
+            batch = [e for e in events if e["type"] == event_type]
+            if batch:
+                results += self.write(event_type, batch)
+
+        if self.on_result:
+            for result in results:
+                self.on_result(result)
+        return results
+
+    def write(self, event_type, batch):
+        # Ordering by topic keeps lock acquisition consistent between concurrent batches
+        batch = sorted(batch, key=lambda e: topic_id(event_type, e["payload"]))
+        try:
+            with self.driver.session() as session:
+                counters = session.write_transaction(
+                    lambda tx: tx.run(BATCH_QUERIES[event_type], {"events": [e["payload"] for e in batch]}).summary().counters)
+            logger.info(f"Imported {len(batch)} {event_type} events in one transaction: {counters}")
+            return [{"key": e["key"], "type": event_type, "ok": True, "error": None} for e in batch]
+        except Exception as e:
+            logger.info(f"Batch of {len(batch)} {event_type} events failed, retrying one by one: {e}")
+
+        # Fall back to one transaction per event so a single bad payload can't fail its neighbours
+        return [self.write_one(event_type, e) for e in batch]
+
+    def write_one(self, event_type, event):
+        try:
+            with self.driver.session() as session:
+                session.write_transaction(
+                    lambda tx: tx.run(SINGLE_QUERIES[event_type], {"params": event["payload"]}).consume())
+            return {"key": event["key"], "type": event_type, "ok": True, "error": None}
+        except Exception as e:
+            logger.info(f"Failed to import {event_type} event {event['key']}: {e}")
+            return {"key": event["key"], "type": event_type, "ok": False, "error": str(e)}
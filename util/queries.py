@@ -1,8 +1,9 @@
 store_badges_query = """
-MATCH (discourseUser:DiscourseUser {id: $id})
+UNWIND $users AS user
+MATCH (discourseUser:DiscourseUser {id: user.id})
 SET discourseUser.lastBadgeRefresh = datetime()
-WITH discourseUser
-    UNWIND $badges AS badge
+WITH discourseUser, user
+    UNWIND user.badges AS badge
 MERGE (discourseBadge:DiscourseBadge {id: badge.id})
 ON CREATE SET discourseBadge.name = badge.name, discourseBadge.description = badge.description
 MERGE (discourseUser)-[:HAS_BADGE]->(discourseBadge)
@@ -44,6 +45,36 @@ LIMIT 100
 """
 
 
+synced_groups_query = """
+MATCH (group:DiscourseGroup)
+WHERE group.id IN $groupIds
+RETURN group.id AS id, group.name AS name
+"""
+
+sync_group_members_query = """
+MATCH (group:DiscourseGroup {id: $groupId})
+SET group.lastMemberSync = datetime()
+WITH group
+OPTIONAL MATCH (former:DiscourseUser)-[stale:IN_GROUP]->(group)
+WHERE NOT former.id IN $memberIds
+DELETE stale
+WITH group, count(stale) AS removed
+OPTIONAL MATCH (user:DiscourseUser)
+WHERE user.id IN $memberIds AND NOT (user)-[:IN_GROUP]->(group)
+FOREACH (_ IN CASE WHEN user IS NULL THEN [] ELSE [1] END | CREATE (user)-[:IN_GROUP]->(group))
+RETURN removed, count(user) AS added
+"""
+
+
+confirm_group_members_query = """
+MERGE (group:DiscourseGroup {id: toInteger($groupId)})
+WITH group
+UNWIND $discourseIds AS discourseId
+MATCH (user:DiscourseUser {id: discourseId})
+MERGE (user)-[:IN_GROUP]->(group)
+"""
+
+
 users_who_passed_query_but_dont_have_badge = """
 MATCH (user:User)-[:TOOK]->(exam)
 WHERE exists(exam.certificatePath) AND exam.passed
@@ -72,11 +103,25 @@ LIMIT 50
 """
 
 
-did_user_pass_query = """
-MATCH path = (user:User {auth0_key: $externalId})-[:TOOK]->(exam)
+certified_users_query = """
+UNWIND $externalIds AS externalId
+MATCH (user:User {auth0_key: externalId})-[:TOOK]->(exam)
 WHERE exists(exam.certificatePath) AND exam.passed
-WITH count(*) AS count
-RETURN CASE WHEN count > 0 THEN true ELSE false END AS certified
+RETURN DISTINCT externalId
+"""
+
+confirm_badges_query = """
+MERGE (badge:DiscourseBadge {id: toInteger($badgeId)})
+WITH badge
+UNWIND $discourseIds AS discourseId
+MATCH (user:DiscourseUser {id: discourseId})
+MERGE (user)-[:HAS_BADGE]->(badge)
+"""
+
+badge_holders_query = """
+UNWIND $discourseIds AS discourseId
+MATCH (:DiscourseUser {id: discourseId})-[:HAS_BADGE]->(:DiscourseBadge {id: toInteger($badgeId)})
+RETURN discourseId
 """
 
 did_discourse_user_pass_query = """
@@ -88,46 +133,38 @@ RETURN CASE WHEN count > 0 THEN true ELSE false END AS certified
 """
 
 
+# Week is the week of the month with weeks starting on Sunday, matching the 'yyyy-MM-W' keys the API has always returned
 ninjas_api_so_query = """\
-WITH $now as currentMonth
-Match (u:User:StackOverflow)
-match (u)-[:POSTED]->(a:Answer)-[:ANSWERED]->(q:Question)
-WHERE apoc.date.format(coalesce(a.created,q.created),'s','yyyy-MM') = currentMonth
-with *, apoc.date.format(coalesce(a.created,q.created),'s','yyyy-MM-W') as week
-with currentMonth, week, u.name as user, count(*) as total, sum(case when a.is_accepted then 1 else 0 end) as accepted
+WITH $now AS currentMonth, datetime($now + '-01T00:00:00Z') AS monthStart
+MATCH (a:Answer)
+WHERE monthStart <= a.effectiveDate < monthStart + duration('P1M')
+MATCH (u:User:StackOverflow)-[:POSTED]->(a)-[:ANSWERED]->(:Question)
+WITH currentMonth, a, u, (a.effectiveDate.day + monthStart.dayOfWeek % 7 - 1) / 7 + 1 AS weekOfMonth
+WITH currentMonth, currentMonth + '-' + toString(weekOfMonth) AS week, u.name AS user,
+     count(*) AS total, sum(CASE WHEN a.is_accepted THEN 1 ELSE 0 END) AS accepted
 ORDER BY total DESC
-return currentMonth, user, collect([week,total,accepted]) as weekly
+RETURN currentMonth, user, collect([week, total, accepted]) AS weekly
 """
 
 
 ninjas_api_discourse_query = """\
-MATCH path = (u)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)-[:IN_CATEGORY]->(category)
-WHERE post.createdAt.year = $year AND post.createdAt.month = $month
-AND post.number > 1
-AND not((u)-[:POSTED_CONTENT]->(:DiscoursePost {number: 1})-[:PART_OF]->(topic))
-with *, post.createdAt.week as week
-with week, u, count(*) as total, collect(DISTINCT {name: category.name, id: category.id}) AS categories
-ORDER BY week, total DESC
-WITH u, collect([toString(date(toString($year - (week / 52)) + "-W" + toString(week))), total]) as weekly, categories
-WITH u, [(u)<-[:DISCOURSE_ACCOUNT]-(user) WHERE exists(user.auth0_key) | u][0] AS discourseUser, weekly, categories
-WITH u.name AS user, discourseUser.screenName AS discourseUser,
-     exists((discourseUser)-[:IN_GROUP]->(:DiscourseGroup {id: 50})) AS isNinja,
-     apoc.map.fromPairs(apoc.coll.toSet(apoc.coll.flatten(collect(weekly)))) AS weekly,
-     apoc.coll.toSet(apoc.coll.flatten(collect(categories))) AS categories
-RETURN user, discourseUser, weekly, categories, isNinja
-ORDER BY size(keys(weekly)) DESC
+MATCH (activity:DiscourseWeeklyActivity)
+WHERE activity.month = date({year: $year, month: $month})
+MATCH (u:DiscourseUser)-[:HAS_ACTIVITY]->(activity)
+WITH u, activity
+ORDER BY activity.week
+WITH u, collect(activity) AS activities
+WITH u, activities, [(u)<-[:DISCOURSE_ACCOUNT]-(user) WHERE exists(user.auth0_key) | u][0] AS discourseUser
+RETURN u.name AS user, discourseUser.screenName AS discourseUser,
+       apoc.map.fromPairs([activity IN activities | [toString(activity.week), activity.replies]]) AS weekly,
+       apoc.coll.toSet(apoc.coll.flatten([activity IN activities |
+         [(activity)-[:ACTIVE_IN]->(:DiscourseTopic)-[:IN_CATEGORY]->(category) | {name: category.name, id: category.id}]
+       ])) AS categories,
+       exists((discourseUser)-[:IN_GROUP]->(:DiscourseGroup {id: 50})) AS isNinja
+ORDER BY size(activities) DESC
 """
 
-ninjas_so_query = """\
-WITH $now as currentMonth
-Match (u:User:StackOverflow)
-match (u)-[:POSTED]->(a:Answer)-[:ANSWERED]->(q:Question)
-WHERE apoc.date.format(coalesce(a.created,q.created),'s','yyyy-MM') = currentMonth
-with *, apoc.date.format(coalesce(a.created,q.created),'s','yyyy-MM-W') as week
-with currentMonth, week, u.name as user, count(*) as total, sum(case when a.is_accepted then 1 else 0 end) as accepted
-ORDER BY total DESC
-return currentMonth, user, collect([week,total,accepted]) as weekly
-"""
+ninjas_so_query = ninjas_api_so_query
 
 
 ninjas_discourse_query = """\
@@ -160,26 +197,54 @@ MERGE (category:DiscourseCategory {id: event.id})
 SET category.name = event.name, category.description = event.description
 """
 
+# Only topics whose numbers moved are written, so an hourly sync costs writes in proportion to activity
 update_topics_query = """\
 UNWIND $params AS t
 MATCH (topic:DiscourseTopic {id: t.id })
-SET topic.likeCount = toInteger(t.like_count),
-    topic.views = toInteger(t.views),
-    topic.replyCount = toInteger(t.replyCount)
+WITH topic, [toInteger(t.like_count), toInteger(t.views), toInteger(t.reply_count)] AS stats
+WHERE [coalesce(topic.likeCount, -1), coalesce(topic.views, -1), coalesce(topic.replyCount, -1)] <> stats
+SET topic.likeCount = stats[0],
+    topic.views = stats[1],
+    topic.replyCount = stats[2]
+RETURN count(topic) AS changed
+"""
+
+# An author without a feedUrl or username gets the feed of the @handle in the link of one of their stored posts
+medium_feeds_query = """\
+OPTIONAL MATCH (ma:MediumAuthor)
+WITH ma, coalesce(ma.username, head([(ma)<-[:AUTHORED_BY]-(mp:MediumPost) WHERE mp.url CONTAINS 'medium.com/@' |
+       split(split(split(mp.url, 'medium.com/@')[1], '/')[0], '?')[0]])) AS username
+WITH [url IN collect(coalesce(ma.feedUrl, 'https://medium.com/feed/@' + username)) WHERE url IS NOT NULL] AS authorFeeds
+UNWIND apoc.coll.toSet([$publicationFeed] + authorFeeds) AS url
+OPTIONAL MATCH (feed:MediumFeed {url: url})
+RETURN url, feed.etag AS etag, feed.modified AS modified
 """
 
-store_medium_post_query = """\
-MATCH (ma:MediumAuthor {name: $author})
-MERGE (mp:MediumPost {guid: $guid})
+known_medium_posts_query = """\
+UNWIND $guids AS guid
+MATCH (mp:MediumPost {guid: guid})
+RETURN collect(mp.guid) AS guids
+"""
+
+store_medium_posts_query = """\
+UNWIND $posts AS post
+MATCH (ma:MediumAuthor {name: post.author})
+MERGE (mp:MediumPost {guid: post.guid})
 ON CREATE SET
-  mp.title = $title,
-  mp.author = $author,
-  mp.url = $url,
-  mp.content = $content,
-  mp.date = $date
+  mp.title = post.title,
+  mp.author = post.author,
+  mp.url = post.url,
+  mp.content = post.content,
+  mp.date = post.date
 MERGE (mp)-[:AUTHORED_BY]->(ma)
 """
 
+store_medium_feeds_query = """\
+UNWIND $feeds AS f
+MERGE (feed:MediumFeed {url: f.url})
+SET feed.etag = f.etag, feed.modified = f.modified, feed.lastFetched = datetime()
+"""
+
 get_medium_posts_query = """\
 MATCH (mp:MediumPost)-[:AUTHORED_BY]->(ma:MediumAuthor)-[:HAS_DISCOURSE]->(du:DiscourseUser)
 WHERE
@@ -207,6 +272,7 @@ SET user.name = $params.topic.created_by.username,
     user.avatarTemplate = $params.topic.created_by.avatar_template
 
 MERGE (topic:DiscourseTopic {id: $params.topic.id })
+WITH user, topic, coalesce(topic.approved, false) AS alreadyApproved
 SET topic.title = $params.topic.title,
     topic.createdAt = datetime($params.topic.created_at),
     topic.slug = $params.topic.slug,
@@ -218,53 +284,83 @@ SET topic.title = $params.topic.title,
     topic.categoryId = $params.topic.category_id
 
 MERGE (user)-[:POSTED_CONTENT]->(topic)
+RETURN alreadyApproved
 """
 
-community_content_active_query = """\
-OPTIONAL MATCH (topic:DiscourseTopic {id: $params.topic.id })
-RETURN topic
+# The post/topic import bodies are shared between the single event queries used by the webhook and the
+# UNWIND versions used for batched ingestion, so both paths always apply the same MERGE chain.
+# Counts each reply once in its author's (:DiscourseWeeklyActivity) for the ISO week and month it was posted in, skipping
+# replies to the author's own topics. Expects user, topic and post to be in scope. Rollups are merged on a unique key so
+# concurrent imports of the same user's week can't create two of them.
+weekly_activity_body = """\
+WITH user, topic, post
+WHERE post.number > 1 AND post.countedInActivity IS NULL
+  AND NOT exists((user)-[:POSTED_CONTENT]->(:DiscoursePost {number: 1})-[:PART_OF]->(topic))
+WITH user, topic, post, date.truncate('month', post.createdAt) AS month, date.truncate('week', post.createdAt) AS week
+MERGE (activity:DiscourseWeeklyActivity {key: toString(user.id) + '/' + toString(month) + '/' + toString(week)})
+ON CREATE SET activity.userId = user.id, activity.month = month, activity.week = week, activity.replies = 0
+SET activity.locked = true
+SET activity.replies = activity.replies + 1, post.countedInActivity = true
+REMOVE activity.locked
+MERGE (user)-[:HAS_ACTIVITY]->(activity)
+MERGE (activity)-[:ACTIVE_IN]->(topic)
 """
 
-import_post_query = """\
-MERGE (user:DiscourseUser {id: $params.post.user_id })
-ON CREATE SET user.name = $params.post.username,
-    user.avatarTemplate = $params.post.avatar_template
+import_post_body = """\
+MERGE (user:DiscourseUser {id: params.post.user_id })
+ON CREATE SET user.name = params.post.username,
+    user.avatarTemplate = params.post.avatar_template
 
-MERGE (topic:DiscourseTopic {id: $params.post.topic_id })
-SET topic.title = $params.post.topic_title, topic.slug = $params.post.topic_slug
+MERGE (topic:DiscourseTopic {id: params.post.topic_id })
+SET topic.title = params.post.topic_title, topic.slug = params.post.topic_slug
 
 MERGE (user)-[:POSTED_CONTENT]->(topic)
 
-MERGE (post:DiscoursePost {id: $params.post.id})
-SET post.text = $params.post.cooked, post.createdAt = datetime($params.post.created_at),
-    post.number = $params.post.post_number
+MERGE (post:DiscoursePost {id: params.post.id})
+SET post.text = params.post.cooked, post.createdAt = datetime(params.post.created_at),
+    post.number = params.post.post_number
 
 MERGE (user)-[:POSTED_CONTENT]->(post)
 MERGE (post)-[:PART_OF]->(topic)
-"""
-
-import_topic_query = """\
-MATCH (category:DiscourseCategory {id: $params.topic.category_id})
-
-MERGE (user:DiscourseUser {id: $params.topic.user_id })
-ON CREATE SET user.name = $params.topic.created_by.username,
-              user.avatarTemplate = $params.topic.created_by.avatar_template
-MERGE (topic:DiscourseTopic {id: $params.topic.id })
-SET topic.title = $params.topic.title,
-    topic.createdAt = datetime($params.topic.created_at),
-    topic.slug = $params.topic.slug,
-    topic.approved = $params.approved,
-    topic.rating = $params.rating,
-    topic.likeCount = toInteger($params.topic.like_count),
-    topic.views = toInteger($params.topic.views),
-    topic.replyCount = toInteger($params.topic.reply_count),
-    topic.categoryId = $params.topic.category_id
+WITH user, topic, post, post.countedInTopic IS NULL AS uncounted
+SET topic.postCount = coalesce(topic.postCount, 0) + CASE WHEN uncounted THEN 1 ELSE 0 END,
+    post.countedInTopic = true
+SET topic.open = CASE WHEN post.number > 1 THEN false ELSE coalesce(topic.open, true) END
+FOREACH (recommended IN [(topic)-[r:PART_OF]->(:DiscourseRecommendations)-[:SUGGESTED_FOR]->(user)
+                         WHERE post.number > 1 AND NOT coalesce(r.answeredAt <= post.createdAt, false) | r] |
+  SET recommended.answeredAt = post.createdAt)
+""" + weekly_activity_body
+
+import_post_query = "WITH $params AS params\n" + import_post_body
+
+import_posts_batch_query = "UNWIND $events AS params\n" + import_post_body
+
+import_topic_body = """\
+MATCH (category:DiscourseCategory {id: params.topic.category_id})
+
+MERGE (user:DiscourseUser {id: params.topic.user_id })
+ON CREATE SET user.name = params.topic.created_by.username,
+              user.avatarTemplate = params.topic.created_by.avatar_template
+MERGE (topic:DiscourseTopic {id: params.topic.id })
+SET topic.title = params.topic.title,
+    topic.createdAt = datetime(params.topic.created_at),
+    topic.slug = params.topic.slug,
+    topic.approved = coalesce(params.approved, topic.approved),
+    topic.rating = coalesce(params.rating, topic.rating),
+    topic.likeCount = toInteger(params.topic.like_count),
+    topic.views = toInteger(params.topic.views),
+    topic.replyCount = toInteger(params.topic.reply_count),
+    topic.categoryId = params.topic.category_id
 
 
 MERGE (topic)-[:IN_CATEGORY]->(category)
 MERGE (user)-[:POSTED_CONTENT]->(topic)
 """
 
+import_topic_query = "WITH $params AS params\n" + import_topic_body
+
+import_topics_batch_query = "UNWIND $events AS params\n" + import_topic_body
+
 user_events_query = """\
 MERGE (discourse:DiscourseUser {id: $params.user.id })
 SET discourse.name = $params.user.username,
@@ -320,76 +416,193 @@ find_ninja_to_process = """
 MATCH (me:DiscourseUser)-[:IN_GROUP]->(:DiscourseGroup {id: 50})
 WHERE not((me)<-[:SUGGESTED_FOR]-(:DiscourseRecommendations {week: $weekStarting}))
 RETURN me {.name, .id, .screenName} AS u
-LIMIT $limit
 """
 
-find_topics_to_recommend = """
-MATCH (me:DiscourseUser {id: $userId})
-MATCH (me)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)-[:IN_CATEGORY]->(category)
-WITH me, category, count(*) AS count
-ORDER BY count DESC
-LIMIT 5
-WITH me, collect(category) AS categories
-
-MATCH (u:DiscourseUser)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)
-WITH me, topic, count(*) AS count, categories
-WHERE count = 1
-AND exists((topic)-[:IN_CATEGORY]->())
-AND topic.createdAt > datetime() - duration({days: 7})
-AND not((topic)-[:PART_OF]->(:DiscourseRecommendations)-[:SUGGESTED_FOR]->(me))
-MATCH (topic)-[:IN_CATEGORY]->(c)
-WHERE c in categories
-WITH me, topic, collect(c.name) AS categories
-ORDER BY rand()
-LIMIT 3
-
-RETURN topic.title AS title,
-"https://community.neo4j.com/t/" + topic.id AS link,
-categories,
-topic.createdAt AS createdAt,
-topic.id AS topicId
-ORDER BY topic.createdAt DESC
-
-UNION ALL
-
-MATCH (me:DiscourseUser {id: $userId})
-
-MATCH (u:DiscourseUser)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)
-WITH me, topic, count(*) AS count
-WHERE count = 1
+recommendation_candidates_query = """
+MATCH (topic:DiscourseTopic)
+WHERE topic.createdAt > datetime() - duration({days: 7}) AND topic.open = true
 AND exists((topic)-[:IN_CATEGORY]->())
-AND topic.createdAt > datetime() - duration({days: 7})
-AND not((topic)-[:PART_OF]->(:DiscourseRecommendations)-[:SUGGESTED_FOR]->(me))
-MATCH (topic)-[:IN_CATEGORY]->(c)
-WITH me, topic, collect(c.name) AS categories
-ORDER BY rand()
+RETURN topic.id AS topicId, topic.title AS title, topic.createdAt AS createdAt,
+       [(asker:DiscourseUser)-[:POSTED_CONTENT]->(:DiscoursePost {number: 1})-[:PART_OF]->(topic) | asker.id][0] AS askerId,
+       [(topic)-[:IN_CATEGORY]->(c) | c.id] AS categoryIds,
+       [(topic)-[:IN_CATEGORY]->(c) | c.name] AS categories
+"""
 
-RETURN topic.title AS title,
-"https://community.neo4j.com/t/" + topic.id AS link,
-categories,
-topic.createdAt AS createdAt,
-topic.id AS topicId
-ORDER BY topic.createdAt DESC
+ninja_category_affinity_query = """
+UNWIND $userIds AS userId
+MATCH (me:DiscourseUser {id: userId})-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)-[:IN_CATEGORY]->(category)
+RETURN userId, category.id AS categoryId, count(*) AS count
+"""
+
+already_recommended_query = """
+UNWIND $topicIds AS topicId
+MATCH (topic:DiscourseTopic {id: topicId})-[:PART_OF]->(:DiscourseRecommendations)-[:SUGGESTED_FOR]->(me)
+WHERE me.id IN $userIds
+RETURN DISTINCT me.id AS userId, topic.id AS topicId
 """
 
 save_recommendations_query = """
-MATCH (me:DiscourseUser {id: $userId})
-MERGE (recommendations: DiscourseRecommendations {week: $weekStarting, user: $userId})
+UNWIND $recommendations AS recommended
+MATCH (me:DiscourseUser {id: recommended.userId})
+MERGE (recommendations: DiscourseRecommendations {week: $weekStarting, user: recommended.userId})
 SET recommendations.sent = datetime()
 MERGE (recommendations)-[:SUGGESTED_FOR]->(me)
-WITH recommendations
-UNWIND $topics AS topicId
+WITH recommendations, recommended
+UNWIND recommended.topics AS topicId
 MATCH (topic:DiscourseTopic {id: topicId})
 MERGE (topic)-[:PART_OF]->(recommendations)
 """
 
-answered_recommendations_query = """
-MATCH (topic:DiscourseTopic)-[:PART_OF]->(rec)-[:SUGGESTED_FOR]->(user)
-WITH topic, collect(user.name) AS users
-OPTIONAL MATCH (answerer)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)
-WHERE post.number > 1
-WITH topic, users, collect(DISTINCT answerer.name) AS answerers
-ORDER BY topic.createdAt DESC
-return topic.title, toString(topic.createdAt),  users, answerers, size(apoc.coll.intersection(users, answerers)) > 0,
-       "https://community.neo4j.com/t/" + topic.id AS link
+recommendation_effectiveness_fields = """
+RETURN toString(rec.week) AS week, user.name AS user, topic.id AS topicId, topic.title AS title,
+       "https://community.neo4j.com/t/" + topic.id AS link, toString(topic.createdAt) AS createdAt,
+       toString(recommended.answeredAt) AS answeredAt
+ORDER BY rec.week DESC, user.name, topic.id
+SKIP $skip
+LIMIT $limit
+"""
+
+recommendation_effectiveness_query = """
+MATCH (topic:DiscourseTopic)-[recommended:PART_OF]->(rec:DiscourseRecommendations)-[:SUGGESTED_FOR]->(user)
+""" + recommendation_effectiveness_fields
+
+recommendation_effectiveness_week_query = """
+MATCH (rec:DiscourseRecommendations {week: date($week)})
+MATCH (topic:DiscourseTopic)-[recommended:PART_OF]->(rec)-[:SUGGESTED_FOR]->(user)
+""" + recommendation_effectiveness_fields
+
+backfill_recommendation_answers_query = """\
+CALL apoc.periodic.iterate(
+  "MATCH (topic:DiscourseTopic)-[recommended:PART_OF]->(:DiscourseRecommendations)-[:SUGGESTED_FOR]->(user)
+   RETURN topic, recommended, user",
+  "OPTIONAL MATCH (user)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)
+   WHERE post.number > 1
+   WITH recommended, min(post.createdAt) AS answeredAt
+   SET recommended.answeredAt = answeredAt",
+  {batchSize: 1000, parallel: false})
+YIELD batches, total, errorMessages
+RETURN batches, total, errorMessages
+"""
+
+# Taking the write lock before reading the bucket serialises concurrent Lambdas drawing from the same budget
+take_api_budget_query = """
+MERGE (budget:DiscourseApiBudget {name: $name})
+ON CREATE SET budget.tokens = toFloat($capacity), budget.updatedAt = timestamp()
+SET budget.locked = true
+WITH budget, timestamp() AS now
+WITH budget, now, budget.tokens + (now - budget.updatedAt) * $refillPerMs AS refilled
+WITH budget, now, CASE WHEN refilled > $capacity THEN toFloat($capacity) ELSE refilled END AS available
+WITH budget, now, available, available - $cost >= $floor AS granted
+SET budget.tokens = CASE WHEN granted THEN available - $cost ELSE available END,
+    budget.updatedAt = now
+REMOVE budget.locked
+RETURN granted, available
+"""
+
+cached_ninjas_api_query = """\
+MATCH (cache:NinjasApiCache {month: $month})
+WHERE cache.closed OR cache.cachedAt > datetime() - duration({seconds: $ttl})
+RETURN cache.body AS body
+"""
+
+store_ninjas_api_cache_query = """\
+MERGE (cache:NinjasApiCache {month: $month})
+SET cache.body = $body, cache.closed = $closed, cache.cachedAt = datetime()
+"""
+
+clear_ninjas_api_cache_query = """\
+MATCH (cache:NinjasApiCache)
+DELETE cache
+RETURN count(*) AS cleared
+"""
+
+clear_ninjas_api_cache_months_query = """\
+UNWIND $months AS month
+MATCH (cache:NinjasApiCache {month: month})
+DELETE cache
+RETURN count(*) AS cleared
+"""
+
+backfill_weekly_activity_query = """\
+CALL apoc.periodic.iterate($outer, $inner, {batchSize: 1000, parallel: false})
+YIELD batches, total, errorMessages
+RETURN batches, total, errorMessages
+"""
+
+backfill_weekly_activity_posts = """\
+MATCH (user:DiscourseUser)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic:DiscourseTopic)
+WHERE post.number > 1 AND post.countedInActivity IS NULL
+RETURN user, topic, post
+"""
+
+# Answers are written by the Stack Overflow importer, so new ones are picked up by re-running this on a schedule
+# Full pass for answers imported before effectiveDate existed. Answers with no date of their own or on their
+# question are marked so later passes skip them
+set_answer_effective_dates_query = """\
+CALL apoc.periodic.iterate(
+  "MATCH (a:Answer) WHERE a.effectiveDate IS NULL AND a.effectiveDateMissing IS NULL
+   OPTIONAL MATCH (a)-[:ANSWERED]->(q:Question)
+   RETURN a, coalesce(a.created, q.created) AS created",
+  "SET a.effectiveDate = CASE WHEN created IS NULL THEN null ELSE datetime({epochSeconds: toInteger(created)}) END,
+       a.effectiveDateMissing = CASE WHEN created IS NULL THEN true ELSE null END",
+  {batchSize: 10000, parallel: true})
+YIELD batches, total, errorMessages
+RETURN batches, total, errorMessages
+"""
+
+new_answer_effective_dates_query = """\
+MATCH (a:Answer)
+WHERE a.created > $since AND a.effectiveDate IS NULL
+SET a.effectiveDate = datetime({epochSeconds: toInteger(a.created)})
+RETURN count(a) AS total, collect(DISTINCT substring(toString(date(a.effectiveDate)), 0, 7)) AS months
+"""
+
+applied_schema_migrations_query = """\
+MATCH (migration:SchemaMigration)
+RETURN migration.version AS version
+"""
+
+record_schema_migration_query = """\
+MERGE (migration:SchemaMigration {version: $version})
+SET migration.description = $description, migration.appliedAt = datetime()
+"""
+
+backfill_topic_post_counts_query = """\
+CALL apoc.periodic.iterate(
+  "MATCH (topic:DiscourseTopic) RETURN topic",
+  "OPTIONAL MATCH (:DiscourseUser)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic)
+   WITH topic, collect(post) AS posts
+   FOREACH (post IN posts | SET post.countedInTopic = true)
+   SET topic.postCount = size(posts),
+       topic.open = size(posts) > 0 AND none(post IN posts WHERE post.number > 1)",
+  {batchSize: 1000, parallel: false})
+YIELD batches, total, errorMessages
+RETURN batches, total, errorMessages
+"""
+
+answerer_topics_query = """\
+MATCH (user:DiscourseUser)-[:POSTED_CONTENT]->(post:DiscoursePost)-[:PART_OF]->(topic:DiscourseTopic)
+WHERE post.number > 1 AND post.createdAt > datetime() - duration({days: $windowDays})
+RETURN DISTINCT user.id AS userId, topic.id AS topicId
+"""
+
+store_similar_answerers_query = """\
+UNWIND $users AS row
+MATCH (user:DiscourseUser {id: row.userId})
+UNWIND row.neighbours AS neighbour
+MATCH (other:DiscourseUser {id: neighbour.userId})
+MERGE (user)-[similar:SIMILAR_ANSWERER]->(other)
+SET similar.score = neighbour.score, similar.computedAt = $computedAt
+"""
+
+remove_stale_similar_answerers_query = """\
+MATCH (:DiscourseUser)-[similar:SIMILAR_ANSWERER]->(:DiscourseUser)
+WHERE similar.computedAt <> $computedAt
+DELETE similar
+"""
+
+ninja_similar_answerers_query = """
+UNWIND $userIds AS userId
+MATCH (me:DiscourseUser {id: userId})-[similar:SIMILAR_ANSWERER]->(peer)
+RETURN userId, peer.id AS peerId, similar.score AS score
 """
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def top_categories(affinities, user_ids, category_ids, limit=5):
+    # affinities is a list of (userId, categoryId, count). Each user's top categories by number of posts are ranked
+    # over all of their categories, then projected onto category_ids as a users x categories 0/1 matrix
+    by_user = {}
+    for user_id, category_id, count in affinities:
+        if count > 0:
+            by_user.setdefault(user_id, []).append((count, category_id))
+
+    columns = {category_id: i for i, category_id in enumerate(category_ids)}
+    top = np.zeros((len(user_ids), len(category_ids)))
+    for i, user_id in enumerate(user_ids):
+        for _, category_id in sorted(by_user.get(user_id, []), key=lambda pair: -pair[0])[:limit]:
+            if category_id in columns:
+                top[i, columns[category_id]] = 1
+    return top
+
+
+def asker_similarity(similar, user_ids, asker_ids):
+    # similar is a list of (userId, peerId, score), returns a users x topics matrix of how similar each user is to
+    # the person who asked each topic
+    users = {user_id: i for i, user_id in enumerate(user_ids)}
+    topics_by_asker = {}
+    for j, asker_id in enumerate(asker_ids):
+        topics_by_asker.setdefault(asker_id, []).append(j)
+
+    scores = np.zeros((len(user_ids), len(asker_ids)))
+    for user_id, peer_id, score in similar:
+        if user_id in users:
+            scores[users[user_id], topics_by_asker.get(peer_id, [])] = score
+    return scores
+
+
+def recommend(user_categories, topic_categories, created_at, excluded, similarity=None, per_user=3, rng=None):
+    # Picks per_user topics for every user: topics in one of their top categories or asked by a similar answerer
+    # first, the more similar the asker the earlier, then the newest of the rest. Returns a users x per_user array of
+    # topic indexes, -1 where there weren't enough topics.
+    rng = rng or np.random.default_rng()
+    users, topics = excluded.shape
+    if not users or not topics:
+        return np.full((users, per_user), -1)
+
+    if similarity is None:
+        similarity = np.zeros((users, topics))
+    matches = (user_categories @ topic_categories.T > 0) | (similarity > 0)
+    span = np.ptp(created_at) or 1
+    recency = (created_at - created_at.min()) / span / 2
+    keys = np.where(matches, 2 + similarity + rng.random((users, topics)) / 2, 1 + recency)
+    keys[excluded] = -np.inf
+
+    picks = np.argsort(-keys, axis=1)[:, :per_user]
+    picked_keys = np.take_along_axis(keys, picks, axis=1)
+    picks[np.isneginf(picked_keys)] = -1
+    if picks.shape[1] < per_user:
+        picks = np.pad(picks, ((0, 0), (0, per_user - picks.shape[1])), constant_values=-1)
+    return picks
@@ -0,0 +1,170 @@
+# Versioned schema migrations for every key the queries MERGE or MATCH on. Run before deploying:
+#
+#   python -m util.schema migrate   # applies pending migrations
+#   python -m util.schema check     # fails if a migration is pending or a query falls back to a label scan
+#
+# Every statement is idempotent, so a migration that failed halfway can simply be run again.
+# Keys other importers own or that can legitimately repeat (User.email, DiscourseUser.name) get plain indexes.
+import logging
+import re
+import sys
+
+import util.db as db
+import util.queries as q
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MIGRATIONS = [
+    (1, "Uniqueness constraints for MERGE keys", [
+        "CREATE CONSTRAINT ON (n:DiscourseUser) ASSERT n.id IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:DiscourseTopic) ASSERT n.id IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:DiscoursePost) ASSERT n.id IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:DiscourseCategory) ASSERT n.id IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:DiscourseBadge) ASSERT n.id IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:DiscourseGroup) ASSERT n.id IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:MediumPost) ASSERT n.guid IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:MediumFeed) ASSERT n.url IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:User) ASSERT n.auth0_key IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:TWIN4j) ASSERT n.date IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:DiscourseApiBudget) ASSERT n.name IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:NinjasApiCache) ASSERT n.month IS UNIQUE",
+        "CREATE CONSTRAINT ON (n:SchemaMigration) ASSERT n.version IS UNIQUE",
+    ]),
+    (2, "Indexes for lookup keys", [
+        "CREATE INDEX ON :DiscourseUser(name)",
+        "CREATE INDEX ON :User(email)",
+        "CREATE INDEX ON :User(id)",
+        "CREATE INDEX ON :Twitter(screen_name)",
+        "CREATE INDEX ON :GitHub(name)",
+        "CREATE INDEX ON :StackOverflow(id)",
+        "CREATE INDEX ON :MediumAuthor(name)",
+        "CREATE INDEX ON :TWIN4jTag(tag, anchor)",
+        "CREATE INDEX ON :DiscourseRecommendations(week, user)",
+        "CREATE INDEX ON :DiscourseRecommendations(week)",
+    ]),
+    (3, "Weekly activity rollups", [
+        "CREATE INDEX ON :DiscourseWeeklyActivity(month)",
+        "CREATE INDEX ON :DiscourseWeeklyActivity(userId, month, week)",
+    ]),
+    (4, "Answer effective dates", [
+        "CREATE INDEX ON :Answer(effectiveDate)",
+    ]),
+    # Neo4j 3.5 only uses a composite index when every key is compared for equality, so recent open topics are
+    # found with a range seek on createdAt and filtered on open
+    (5, "Topic creation dates", [
+        "CREATE INDEX ON :DiscourseTopic(createdAt)",
+    ]),
+    (6, "Reconciliation cursors", [
+        "CREATE CONSTRAINT ON (n:ReconciliationCursor) ASSERT n.name IS UNIQUE",
+    ]),
+    (7, "Answer creation times", [
+        "CREATE INDEX ON :Answer(created)",
+    ]),
+    # Rollups split by concurrent imports before the key existed are merged, summing their replies
+    (8, "Weekly activity keys", [
+        """MATCH (activity:DiscourseWeeklyActivity)
+        WITH activity.userId AS userId, activity.month AS month, activity.week AS week, collect(activity) AS rollups
+        WHERE size(rollups) > 1
+        WITH rollups, reduce(total = 0, rollup IN rollups | total + rollup.replies) AS replies
+        CALL apoc.refactor.mergeNodes(rollups, {properties: 'discard', mergeRels: true}) YIELD node
+        SET node.replies = replies""",
+        """MATCH (activity:DiscourseWeeklyActivity)
+        SET activity.key = toString(activity.userId) + '/' + toString(activity.month) + '/' + toString(activity.week)""",
+        "CREATE CONSTRAINT ON (n:DiscourseWeeklyActivity) ASSERT n.key IS UNIQUE",
+    ]),
+]
+
+# Queries that are meant to sweep a whole label, usually in LIMITed chunks
+LABEL_SCANS_ALLOWED = {
+    "users_badge_refresh_query",
+    "users_groups_refresh_query",
+    "users_who_passed_query_but_dont_have_badge",
+    "users_who_passed_query_but_dont_have_group",
+    "ninjas_discourse_query",
+    "medium_feeds_query",
+    "get_medium_posts_query",
+    "recommendation_effectiveness_query",
+    "backfill_weekly_activity_posts",
+    "answerer_topics_query",
+    "remove_stale_similar_answerers_query",
+    "applied_schema_migrations_query",
+    "clear_ninjas_api_cache_query",
+}
+
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+
+
+def query_registry():
+    # Every standalone query in util.queries; the *_body fragments only run inside the queries built from them
+    return {name: value for name, value in vars(q).items()
+            if isinstance(value, str) and not name.endswith("_body") and re.search(r"\b(MATCH|MERGE)\b", value)}
+
+
+def applied_versions(session):
+    return {row["version"] for row in session.run(q.applied_schema_migrations_query)}
+
+
+def pending_migrations(session):
+    applied = applied_versions(session)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def migrate(driver):
+    with driver.session() as session:
+        for version, description, statements in pending_migrations(session):
+            logger.info(f"Applying schema migration {version}: {description}")
+            for statement in statements:
+                session.run(statement).consume()
+            session.run("CALL db.awaitIndexes()").consume()
+            session.run(q.record_schema_migration_query, {"version": version, "description": description}).consume()
+
+
+def operators(plan):
+    if isinstance(plan, dict):
+        return [plan["operatorType"]] + [op for child in plan.get("children", []) for op in operators(child)]
+    return [plan.operator_type] + [op for child in plan.children for op in operators(child)]
+
+
+def label_scans(session):
+    scans = {}
+    for name, query in query_registry().items():
+        if name in LABEL_SCANS_ALLOWED:
+            continue
+        # EXPLAIN only plans the query, so every parameter can be null
+        params = {param: None for param in re.findall(r"\$(\w+)", query)}
+        plan = session.run("EXPLAIN " + query, params).consume().plan
+        found = [op for op in operators(plan) if op.startswith(SCAN_OPERATORS)]
+        if found:
+            scans[name] = found
+    return scans
+
+
+def check(driver):
+    with driver.session() as session:
+        pending = pending_migrations(session)
+        scans = label_scans(session)
+
+    for version, description, _ in pending:
+        logger.error(f"Schema migration {version} is pending: {description}")
+    for name, found in scans.items():
+        logger.error(f"{name} plans a label scan: {', '.join(found)}")
+    return not pending and not scans
+
+
+def main():
+    logging.basicConfig()
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    driver = db.get_driver()
+    if command == "migrate":
+        migrate(driver)
+    elif command == "check":
+        if not check(driver):
+            sys.exit(1)
+        logger.info("Schema is up to date")
+    else:
+        sys.exit(f"Unknown command {command}, expected migrate or check")
+
+
+if __name__ == "__main__":
+    main()
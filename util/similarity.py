@@ -0,0 +1,32 @@
+import numpy as np
+from scipy import sparse
+
+
+def co_answer_similarity(replies, top_k=10, min_score=0.0):
+    # replies is a list of (userId, topicId) pairs. Users are compared by the cosine of their binary user x topic
+    # reply vectors, and every user gets their top_k most similar other users as a list of (userId, score).
+    user_ids = sorted({user_id for user_id, _ in replies})
+    topic_ids = sorted({topic_id for _, topic_id in replies})
+    if not user_ids:
+        return {}
+
+    users = {user_id: i for i, user_id in enumerate(user_ids)}
+    topics = {topic_id: i for i, topic_id in enumerate(topic_ids)}
+    rows = np.array([users[user_id] for user_id, _ in replies])
+    cols = np.array([topics[topic_id] for _, topic_id in replies])
+    matrix = sparse.csr_matrix((np.ones(len(replies)), (rows, cols)), shape=(len(user_ids), len(topic_ids)))
+    matrix.data[:] = 1
+
+    norms = np.sqrt(np.asarray(matrix.sum(axis=1)).ravel())
+    normalized = sparse.diags(1 / norms) @ matrix
+    similarity = (normalized @ normalized.T).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    neighbours = {}
+    for i, user_id in enumerate(user_ids):
+        start, end = similarity.indptr[i], similarity.indptr[i + 1]
+        scores, columns = similarity.data[start:end], similarity.indices[start:end]
+        best = np.argsort(-scores)[:top_k]
+        neighbours[user_id] = [(user_ids[columns[j]], float(scores[j])) for j in best if scores[j] > min_score]
+    return neighbours
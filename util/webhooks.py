@@ -0,0 +1,71 @@
+import json
+import logging
+
+logger = logging.getLogger()
+
+REQUIRED_HEADERS = ["X-Discourse-Event-Type", "X-Discourse-Event"]
+
+
+def acknowledge(request, route, queue):
+    headers = request.get("headers") or {}
+    missing = [header for header in REQUIRED_HEADERS if header not in headers]
+    if missing:
+        return {"statusCode": 400, "body": f"Missing headers: {', '.join(missing)}", "headers": {}}
+
+    try:
+        json.loads(request["body"])
+    except (KeyError, TypeError, ValueError):
+        return {"statusCode": 400, "body": "Body is not valid JSON", "headers": {}}
+
+    queue.send({
+        "route": route,
+        "headers": {header: headers[header] for header in REQUIRED_HEADERS},
+        "body": request["body"]
+    })
+    return {"statusCode": 200, "body": "Queued the event", "headers": {}}
+
+
+def dispatch(messages, processors, batch_processors=None):
+    batch_processors = batch_processors or {}
+    failed = []
+
+    for route, process_batch in batch_processors.items():
+        batch = [(key, message) for key, message in messages if message["route"] == route]
+        if batch:
+            try:
+                failed += process_batch(batch)
+            except Exception as e:
+                logger.info(f"Failed to process batch of {len(batch)} messages for {route}: {e}")
+                failed += [key for key, _ in batch]
+
+    for key, message in messages:
+        route = message["route"]
+        if route in batch_processors:
+            continue
+        if route not in processors:
+            logger.info(f"Dropping message {key} for unknown route {route}")
+            continue
+        try:
+            processors[route]({"headers": message["headers"], "body": message["body"]})
+        except Exception as e:
+            logger.info(f"Failed to process message {key} for {route}: {e}")
+            failed.append(key)
+
+    return failed
+
+
+def drain(queue, process, batch_size=10):
+    processed, failures = 0, 0
+    while True:
+        messages = queue.receive(batch_size)
+        if not messages:
+            return processed, failures
+
+        failed = set(process(messages))
+        queue.delete([key for key, _ in messages if key not in failed])
+        queue.release(list(failed))
+        processed += len(messages) - len(failed)
+        failures += len(failed)
+        # Failed messages are back on the queue, stop rather than spin on them
+        if failed:
+            return processed, failures
@@ -0,0 +1,106 @@
+import collections
+import json
+import os
+import threading
+import time
+import uuid
+
+import util.aws as aws
+
+
+class SqsQueue:
+    def __init__(self, url):
+        self.url = url
+        self.sqs = aws.client('sqs')
+
+    def send(self, message):
+        self.sqs.send_message(QueueUrl=self.url, MessageBody=json.dumps(message))
+
+    def receive(self, max_messages=10):
+        response = self.sqs.receive_message(QueueUrl=self.url, MaxNumberOfMessages=min(max_messages, 10))
+        return [(m["ReceiptHandle"], json.loads(m["Body"])) for m in response.get("Messages", [])]
+
+    def delete(self, keys):
+        for key in keys:
+            self.sqs.delete_message(QueueUrl=self.url, ReceiptHandle=key)
+
+    def release(self, keys):
+        # Unacknowledged messages become visible again once their visibility timeout expires
+        pass
+
+
+class MemoryQueue:
+    def __init__(self):
+        self.messages = collections.deque()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            self.messages.append((str(uuid.uuid4()), json.dumps(message)))
+
+    def receive(self, max_messages=10):
+        with self.lock:
+            batch = [self.messages.popleft() for _ in range(min(max_messages, len(self.messages)))]
+            self.in_flight.update(batch)
+        return [(key, json.loads(body)) for key, body in batch]
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.in_flight.pop(key, None)
+
+    def release(self, keys):
+        with self.lock:
+            for key in keys:
+                if key in self.in_flight:
+                    self.messages.append((key, self.in_flight.pop(key)))
+
+
+class FileQueue:
+    # One file per message, written under a temporary name and renamed so readers never see partial messages
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def send(self, message):
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex}"
+        tmp = os.path.join(self.path, f".{name}")
+        with open(tmp, "w") as message_file:
+            json.dump(message, message_file)
+        os.replace(tmp, os.path.join(self.path, f"{name}.json"))
+
+    def receive(self, max_messages=10):
+        batch = []
+        for name in sorted(os.listdir(self.path)):
+            if len(batch) >= max_messages:
+                break
+            if not name.endswith(".json"):
+                continue
+            claimed = os.path.join(self.path, f"{name}.claimed")
+            try:
+                os.replace(os.path.join(self.path, name), claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed) as message_file:
+                batch.append((claimed, json.load(message_file)))
+        return batch
+
+    def delete(self, keys):
+        for key in keys:
+            os.remove(key)
+
+    def release(self, keys):
+        for key in keys:
+            os.replace(key, key[:-len(".claimed")])
+
+
+memory_queues = {}
+
+
+def queue_from_url(url):
+    if url.startswith("file://"):
+        return FileQueue(url[len("file://"):])
+    if url.startswith("memory://"):
+        return memory_queues.setdefault(url, MemoryQueue())
+    return SqsQueue(url)